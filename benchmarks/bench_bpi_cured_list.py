@@ -0,0 +1,85 @@
+"""
+Timing of the BPI cured-list pipeline on generated data.
+
+    python -m benchmarks.bench_bpi_cured_list [rows]
+    python -m benchmarks.bench_bpi_cured_list scan
+
+Builds a cured list with the same column layout as the bank's file (barcodes,
+collectors, payment dates, PTP flags and two phone columns) and times
+process_cured_list end to end (default 50,000 rows). "scan" times
+scan_cured_list alone from 1,000 to 100,000 rows; the single streaming pass
+should keep the time per row flat as the list grows.
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, date
+from io import BytesIO
+
+SCAN_SIZES = (1000, 10000, 100000)
+
+import openpyxl
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_KEY", "x" * 40)
+
+from processor.bpi_auto_curing import BPIAutoCuringProcessor, CURED_LIST_COLUMNS
+from processor.reporting import CollectingSink
+
+
+def make_cured_list(rows, seed=0):
+    """Bytes of a generated cured list with rows data rows."""
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append([f"H{i}" for i in range(1, CURED_LIST_COLUMNS + 1)])
+    barcodes = [f"BC{i}" for i in range(max(1, rows * 4 // 5))]
+    for i in range(rows):
+        row = [None] * CURED_LIST_COLUMNS
+        row[0] = rng.choice([None, ""]) if i % 97 == 0 else rng.choice(barcodes)
+        row[1] = rng.choice(["AGENT1", "AGENT2", "SPMADRID", None])
+        row[2] = rng.choice([datetime(2024, 1, 1 + i % 28, 9, 30), date(2024, 2, 3), "2024-03-04", None])
+        row[3] = rng.choice([1500.5, 0, None, 200])
+        row[7] = rng.choice([None, "PTP", "NEGO"])
+        row[16] = f"L{i}"
+        row[17] = f"NAME {i}"
+        row[41] = rng.choice(["09171234567", "+63 917 123 4567", None, 9171234567])
+        row[42] = rng.choice(["09181234567", None, "639181234567"])
+        ws.append(row)
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def time_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench_process(rows):
+    data = make_cured_list(rows)
+    processor = BPIAutoCuringProcessor(sink=CollectingSink())
+    elapsed, result = time_call(processor.process_cured_list, data, sheet_name='Sheet')
+    print(f"process_cured_list  {rows:>7} rows  {elapsed:7.2f}s  "
+          f"({len(result['remarks_df'])} remark rows)")
+
+
+def bench_scan(sizes=SCAN_SIZES):
+    processor = BPIAutoCuringProcessor(sink=CollectingSink())
+    per_row = []
+    for rows in sizes:
+        data = make_cured_list(rows)
+        elapsed, cured = time_call(processor.scan_cured_list, BytesIO(data))
+        per_row.append(elapsed / rows)
+        print(f"scan_cured_list     {rows:>7} rows  {elapsed:7.2f}s  "
+              f"{per_row[-1] * 1e6:6.1f}us/row  ({len(cured['barcodes'])} barcodes)")
+    print(f"time per row, largest vs smallest: {per_row[-1] / per_row[0]:.2f}x")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "scan":
+        bench_scan()
+    else:
+        bench_process(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -25,6 +25,7 @@ else:
 
 #Processors
 from processor.base import BaseProcessor as base_process
+from processor.base import get_sheet_names, read_excel_cached, diff_records, SupabaseBatchClient, SUPABASE_PAGE_SIZE
 from processor.bdo_auto import BDOAutoProcessor as bdo_auto
 from processor.bpi_auto_curing import BPIAutoCuringProcessor as bpi_auto_curing
 from processor.rob_bike import ROBBikeProcessor as rob_bike
@@ -38,6 +39,7 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+batch_client = SupabaseBatchClient(supabase)
 
 warnings.filterwarnings('ignore', category=UserWarning, 
                         message="Cell .* is marked as a date but the serial value .* is outside the limits for dates.*")
@@ -84,6 +86,12 @@ CAMPAIGN_CONFIG = {
     },
 }
 
+def field_result_keys(df):
+    """chcode_status_inserted-date keys, with inserted_date normalized so file and database values compare equal."""
+    inserted_date = pd.to_datetime(df['inserted_date'], errors='coerce', format='ISO8601', utc=True)
+    inserted_date = inserted_date.dt.tz_localize(None).dt.strftime('%Y-%m-%d %H:%M:%S').fillna('None')
+    return df['chcode'].astype(str).str.strip() + '_' + df['status'].astype(str).str.strip() + '_' + inserted_date
+
 def main():
     st.set_page_config(
         page_title="Automation Tool",
@@ -165,9 +173,7 @@ def main():
             TABLE_NAME = 'rob_bike_field_result'
             
             try:
-                xls = pd.ExcelFile(upload_field_result)
-
-                sheet_options = xls.sheet_names
+                sheet_options = get_sheet_names(upload_field_result)
                 if len(sheet_options) > 1: 
                     selected_sheet = st.selectbox(
                         "Select a sheet from the Excel file:",
@@ -179,7 +185,7 @@ def main():
                     selected_sheet = sheet_options[0]
                     
                 if selected_sheet:
-                    df = pd.read_excel(xls, sheet_name=selected_sheet)
+                    df = read_excel_cached(upload_field_result, sheet_name=selected_sheet)
                     df_clean = df.replace({np.nan: 0})
                 
                 if 'chcode' in df_clean.columns and 'status' in df_clean.columns and 'SUB STATUS' in df_clean.columns and 'DATE' in df_clean.columns and 'TIME' in df_clean.columns:
@@ -218,64 +224,28 @@ def main():
                         with st.spinner("Checking for existing records in database..."):
                             df_to_check = df_extracted.copy()
                             
-                            unique_combinations = df_to_check[['chcode', 'status', 'date', 'time', 'inserted_date']].drop_duplicates()
+                            chcodes = df_to_check['chcode'].astype(str).str.strip().unique().tolist()
                             
-                            existing_records = []
-                            total_combinations = len(unique_combinations)
+                            check_progress = st.progress(0)
+                            check_status = st.empty()
+                            check_status.text(f"Fetching existing records for {len(chcodes)} chcodes...")
                             
-                            if total_combinations > 0:
-                                check_progress = st.progress(0)
-                                check_status = st.empty()
-                                check_status.text(f"Checking 0 of {total_combinations} records...")
-                                
-                                batch_size = 100
-                                for i in range(0, total_combinations, batch_size):
-                                    batch = unique_combinations.iloc[i:i+batch_size]
-                                    
-                                    for _, row in batch.iterrows():
-                                        chcode = row['chcode']
-                                        status = row['status']
-                                        inserted_date = row['inserted_date']
-                                        
-                                        query = supabase.table(TABLE_NAME).select("*").eq('chcode', chcode).eq('status', status)
-                                        
-                                        if inserted_date is not None and inserted_date != 'NaT':
-                                            query = query.eq('inserted_date', inserted_date)
-                                            
-                                        try:
-                                            response = query.execute()
-                                            if hasattr(response, 'data') and response.data:
-                                                existing_records.extend(response.data)
-                                        except Exception as e:
-                                            st.warning(f"Error checking record: {str(e)}. Continuing...")
-                                    
-                                    progress_value = min(1.0, (i + batch_size) / total_combinations)
-                                    check_progress.progress(progress_value)
-                                    check_status.text(f"Checking {min(i + batch_size, total_combinations)} of {total_combinations} records...")
-                                
-                                check_progress.empty()
-                                check_status.empty()
+                            existing_records = batch_client.fetch_in(
+                                TABLE_NAME, 'chcode', chcodes, select='chcode, status, inserted_date',
+                                page_size=SUPABASE_PAGE_SIZE, order=('chcode', 'status', 'inserted_date', 'id'),
+                                on_error=lambda batch_ids, e: st.warning(f"Error checking records: {str(e)}. Continuing..."),
+                                on_progress=lambda done, total: check_progress.progress(min(1.0, done / max(1, total)))
+                            )
                             
-                            existing_df = pd.DataFrame(existing_records) if existing_records else pd.DataFrame()
+                            check_progress.empty()
+                            check_status.empty()
                             
-                            if not existing_df.empty:
-                                df_extracted['chcode'] = df_extracted['chcode'].astype(str)
-                                df_extracted['status'] = df_extracted['status'].astype(str)
-                                
-                                existing_df['chcode'] = existing_df['chcode'].astype(str)
-                                existing_df['status'] = existing_df['status'].astype(str)
-                                
-                                df_extracted['unique_key'] = df_extracted['chcode'] + '_' + df_extracted['status'] + '_' + df_extracted['inserted_date'].astype(str)
-                                
-                                existing_keys = []
-                                for _, row in existing_df.iterrows():
-                                    key = str(row['chcode']) + '_' + str(row['status']) + '_' + str(row['inserted_date'])
-                                    existing_keys.append(key)
-                                
-                                df_new_records = df_extracted[~df_extracted['unique_key'].isin(existing_keys)].copy()
-                                df_new_records.drop('unique_key', axis=1, inplace=True)
-                            else:
-                                df_new_records = df_extracted.copy()
+                            existing_df = pd.DataFrame(existing_records, columns=['chcode', 'status', 'inserted_date'])
+                            existing_keys = field_result_keys(existing_df)
+                            
+                            df_extracted['chcode'] = df_extracted['chcode'].astype(str)
+                            df_extracted['status'] = df_extracted['status'].astype(str)
+                            df_new_records = df_extracted[~field_result_keys(df_extracted).isin(existing_keys).to_numpy()].copy()
                         
                         total_records = len(df_extracted)
                         new_records = len(df_new_records)
@@ -338,9 +308,7 @@ def main():
         if upload_dataset:
             TABLE_NAME = 'rob_bike_dataset'
             try:
-                xls = pd.ExcelFile(upload_dataset)
-                
-                sheet_options = xls.sheet_names
+                sheet_options = get_sheet_names(upload_dataset)
                 if len(sheet_options) > 1:
                     selected_sheet = st.selectbox(
                         "Select a sheet from the Excel file:",
@@ -352,7 +320,7 @@ def main():
                     selected_sheet = sheet_options[0]
                     
                 if selected_sheet:     
-                    df = pd.read_excel(xls, sheet_name=selected_sheet)
+                    df = read_excel_cached(upload_dataset, sheet_name=selected_sheet)
                     df_clean = df.replace({np.nan: 0})
                     df_filtered = df_clean.copy()
                 
@@ -410,110 +378,57 @@ def main():
                             df_selected = df_selected.astype(object).where(pd.notnull(df_selected), None)
                             df_selected[unique_id_col] = df_selected[unique_id_col].astype(str).str.strip() 
                             
-                            new_records = df_selected.to_dict(orient="records")
-                            
-                            existing_records = []
-                            batch_size_for_query = 20
-                            
                             progress_bar = st.progress(0)
                             status_text = status_placeholder.empty()
                             status_text.text("Fetching existing records...")
                             
-                            for i in range(0, len(unique_ids), batch_size_for_query):
-                                batch_ids = unique_ids[i:i+batch_size_for_query]
-                                batch_ids = [id for id in batch_ids if id is not None and id != '']
-                                
-                                if batch_ids:
-                                    try:
-                                        batch_response = supabase.table(TABLE_NAME).select("*").in_(unique_id_col, batch_ids).execute()
-                                        if hasattr(batch_response, 'data') and batch_response.data:
-                                            existing_records.extend(batch_response.data)
-                                    except Exception as e:
-                                        st.warning(f"Error fetching batch {i}: {str(e)}. Continuing...")
-                                
-                                progress_value = min(1.0, (i + batch_size_for_query) / max(1, len(unique_ids)))
-                                progress_bar.progress(progress_value)
+                            existing_records = batch_client.fetch_in(
+                                TABLE_NAME, unique_id_col, unique_ids,
+                                on_error=lambda batch_ids, e: st.warning(f"Error fetching batch of {len(batch_ids)}: {str(e)}. Continuing..."),
+                                on_progress=lambda done, total: progress_bar.progress(min(1.0, done / max(1, total)))
+                            )
+                            progress_bar.progress(1.0)
                             
                             existing_df = pd.DataFrame(existing_records) if existing_records else pd.DataFrame()
                             if not existing_df.empty:
                                 existing_df[unique_id_col] = existing_df[unique_id_col].astype(str).str.strip()
                             
-                            records_to_insert = []
-                            records_to_update = []
-                            total_records = len(new_records)
-                            processed_count = 0
-                            
                             status_text.text("Identifying records to insert or update...")
-                            progress_bar.progress(0)
                             
-                            def records_differ(new_record, existing_record):
-                                for key, value in new_record.items():
-                                    if key in existing_record and str(value).strip() != str(existing_record[key]).strip():
-                                        return True
-                                return False
-                            
-                            for new_record in new_records:
-                                processed_count += 1
-                                account_number = str(new_record[unique_id_col]).strip()
-                                
-                                if not existing_df.empty:
-                                    matching_records = existing_df[existing_df[unique_id_col] == account_number]
-                                    
-                                    if not matching_records.empty:
-                                        existing_record = matching_records.iloc[0].to_dict()
-                                        if records_differ(new_record, existing_record):
-                                            new_record['id'] = existing_record['id']
-                                            records_to_update.append(new_record)
-                                    else:
-                                        records_to_insert.append(new_record)
-                                else:
-                                    records_to_insert.append(new_record)
-                                
-                                progress_value = min(1.0, processed_count / total_records)
-                                progress_bar.progress(progress_value)
+                            total_records = len(df_selected)
+                            df_insert, df_update, df_unchanged = diff_records(df_selected, existing_df, unique_id_col)
+                            records_to_insert = df_insert.to_dict(orient="records")
+                            records_to_update = df_update.to_dict(orient="records")
                             
                             status_placeholder.info(f"Found {len(records_to_insert)} records to insert and {len(records_to_update)} records to update.")
                             
-                            batch_size_for_db = 100
                             success_count = 0
-                            
                             if records_to_insert:
                                 status_text.text("Inserting new records...")
                                 progress_bar.progress(0)
                                 
-                                for i in range(0, len(records_to_insert), batch_size_for_db):
-                                    batch = records_to_insert[i:i+batch_size_for_db]
-                                    
-                                    if batch:
-                                        try:
-                                            response = supabase.table(TABLE_NAME).insert(batch).execute()
-                                            if hasattr(response, 'data') and response.data:
-                                                success_count += len(batch)
-                                        except Exception as e:
-                                            st.error(f"Error inserting records batch: {str(e)}")
-                                    
-                                    progress_value = min(1.0, min(i + batch_size_for_db, len(records_to_insert)) / max(1, len(records_to_insert)))
-                                    progress_bar.progress(progress_value)
-                                    status_text.text(f"Inserted {success_count} of {len(records_to_insert)} new records...")
+                                success_count = batch_client.write_rows(
+                                    TABLE_NAME, records_to_insert,
+                                    on_error=lambda batch, e: st.error(f"Error inserting records batch: {str(e)}"),
+                                    on_progress=lambda done, total: progress_bar.progress(min(1.0, done / max(1, total)))
+                                )
+                                status_text.text(f"Inserted {success_count} of {len(records_to_insert)} new records...")
                             
                             update_count = 0
                             if records_to_update:
                                 status_text.text("Updating existing records...")
                                 progress_bar.progress(0)
                                 
-                                for i, record in enumerate(records_to_update):
-                                    record_id = record.pop('id')
-                                    
-                                    try:
-                                        response = supabase.table(TABLE_NAME).update(record).eq('id', record_id).execute()
-                                        if hasattr(response, 'data') and response.data:
-                                            update_count += 1
-                                    except Exception as e:
-                                        st.error(f"Error updating record {record_id}: {str(e)}")
-                                    
-                                    progress_value = min(1.0, (i + 1) / len(records_to_update))
-                                    progress_bar.progress(progress_value)
-                                    status_text.text(f"Updated {update_count} of {len(records_to_update)} existing records...")
+                                # Upsert on id: diff_records already matched account_number to the existing row's id
+                                update_count = batch_client.write_rows(
+                                    TABLE_NAME, records_to_update, upsert=True, on_conflict='id',
+                                    on_error=lambda batch, e: st.error(f"Error updating records batch: {str(e)}"),
+                                    on_progress=lambda done, total: progress_bar.progress(min(1.0, done / max(1, total)))
+                                )
+                                status_text.text(f"Updated {update_count} of {len(records_to_update)} existing records...")
+                            
+                            unchanged_count = total_records - len(records_to_insert) - len(records_to_update)
+                            st.info(f"{success_count} inserted, {update_count} updated, {unchanged_count} unchanged.")
                             
                             total_processed = success_count + update_count
                             if total_processed > 0:
@@ -538,9 +453,7 @@ def main():
         if upload_disposition:
             TABLE_NAME = 'rob_bike_disposition'
             try:
-                xls = pd.ExcelFile(upload_disposition)
-                
-                sheet_options = xls.sheet_names
+                sheet_options = get_sheet_names(upload_disposition)
                 if len(sheet_options) > 1:
                     selected_sheet = st.selectbox(
                         "Select a sheet from the Excel file:",
@@ -552,7 +465,7 @@ def main():
                     selected_sheet = sheet_options[0]    
                     
                 if selected_sheet:
-                    df = pd.read_excel(xls, sheet_name=selected_sheet)
+                    df = read_excel_cached(upload_disposition, sheet_name=selected_sheet)
                     df_clean = df.replace({np.nan: ''})
                     df_filtered = df_clean.copy()
 
@@ -568,11 +481,8 @@ def main():
                         if 'CMS Disposition' in df_filtered.columns:
                             unique_dispositions = df_filtered['CMS Disposition'].drop_duplicates().tolist()
 
-                            existing_response = supabase.table(TABLE_NAME).select("disposition").execute()
-                            if existing_response.data is None:
-                                existing_dispositions = []
-                            else:
-                                existing_dispositions = [record['disposition'] for record in existing_response.data]
+                            existing_response = batch_client.fetch_table(TABLE_NAME, select="disposition", order=('disposition',))
+                            existing_dispositions = [record['disposition'] for record in existing_response]
 
                             records_to_insert = [
                                 {"disposition": d} for d in unique_dispositions if d not in existing_dispositions
@@ -580,6 +490,7 @@ def main():
 
                             if records_to_insert:
                                 insert_response = supabase.table(TABLE_NAME).insert(records_to_insert).execute()
+                                batch_client.invalidate_table(TABLE_NAME)
                                 toast_placeholder = st.empty()
                                 toast_placeholder.success("Upload successful!")
                                 time.sleep(3)
@@ -642,8 +553,7 @@ def main():
 
             for idx, upload_file in enumerate(upload_datasets):
                 try:
-                    xls = pd.ExcelFile(upload_file)
-                    sheet_options = xls.sheet_names
+                    sheet_options = get_sheet_names(upload_file)
                     if len(sheet_options) > 1:
                         selected_sheet = st.selectbox(
                             f"Select a sheet for file {upload_file.name}:",
@@ -655,7 +565,7 @@ def main():
                         selected_sheet = sheet_options[0]
 
                     if selected_sheet:
-                        df = pd.read_excel(xls, sheet_name=selected_sheet)
+                        df = read_excel_cached(upload_file, sheet_name=selected_sheet)
                         df_clean = df.replace({np.nan: ""})
 
                         st.subheader(f"Uploaded File: {upload_file.name}")
@@ -686,24 +596,16 @@ def main():
                     
                     all_unique_ids = [id for id in all_unique_ids if id is not None and id != '']
                     
-                    existing_records = []
-                    batch_size_for_query = 20
                     progress_bar = st.progress(0)
                     status_text = status_placeholder.empty()
                     status_text.text("Fetching existing records...")
                     
-                    for i in range(0, len(all_unique_ids), batch_size_for_query):
-                        batch_ids = all_unique_ids[i:i+batch_size_for_query]
-                        if batch_ids:
-                            try:
-                                batch_response = supabase.table(TABLE_NAME).select("*").in_(unique_id_col, batch_ids).execute()
-                                if hasattr(batch_response, 'data') and batch_response.data:
-                                    existing_records.extend(batch_response.data)
-                            except Exception as e:
-                                st.warning(f"Error fetching batch {i}: {str(e)}. Continuing...")
-                        
-                        progress_value = min(1.0, (i + batch_size_for_query) / max(1, len(all_unique_ids)))
-                        progress_bar.progress(progress_value)
+                    existing_records = batch_client.fetch_in(
+                        TABLE_NAME, unique_id_col, all_unique_ids,
+                        on_error=lambda batch_ids, e: st.warning(f"Error fetching batch of {len(batch_ids)}: {str(e)}. Continuing..."),
+                        on_progress=lambda done, total: progress_bar.progress(min(1.0, done / max(1, total)))
+                    )
+                    progress_bar.progress(1.0)
                     
                     existing_df = pd.DataFrame(existing_records) if existing_records else pd.DataFrame()
                     if not existing_df.empty:
@@ -713,76 +615,41 @@ def main():
                     for file_name, df_selected in file_dataframes:
                         df_selected = df_selected.astype(object).where(pd.notnull(df_selected), None)
                         df_selected[unique_id_col] = df_selected[unique_id_col].astype(str).str.strip()
-                        new_records = df_selected.to_dict(orient="records")
-                        total_records += len(new_records)
+                        total_records += len(df_selected)
                         
-                        def records_differ(new_record, existing_record):
-                            for key, value in new_record.items():
-                                if key in existing_record and str(value).strip() != str(existing_record[key]).strip():
-                                    return True
-                            return False
-                        
-                        for new_record in new_records:
-                            account_number = str(new_record[unique_id_col]).strip()
-                            
-                            if not existing_df.empty:
-                                matching_records = existing_df[existing_df[unique_id_col] == account_number]
-                                
-                                if not matching_records.empty:
-                                    existing_record = matching_records.iloc[0].to_dict()
-                                    if records_differ(new_record, existing_record):
-                                        new_record['id'] = existing_record['id']
-                                        all_records_to_update.append(new_record)
-                                else:
-                                    all_records_to_insert.append(new_record)
-                            else:
-                                all_records_to_insert.append(new_record)
-                        
-                        progress_value = min(1.0, len(all_records_to_insert) + len(all_records_to_update) / max(1, total_records))
-                        progress_bar.progress(progress_value)
+                        df_insert, df_update, df_unchanged = diff_records(df_selected, existing_df, unique_id_col)
+                        all_records_to_insert.extend(df_insert.to_dict(orient="records"))
+                        all_records_to_update.extend(df_update.to_dict(orient="records"))
                     
                     status_placeholder.info(f"Found {len(all_records_to_insert)} records to insert and {len(all_records_to_update)} records to update across all files.")
                     
-                    batch_size_for_db = 100
                     success_count = 0
-                    
                     if all_records_to_insert:
                         status_text.text("Inserting new records...")
                         progress_bar.progress(0)
                         
-                        for i in range(0, len(all_records_to_insert), batch_size_for_db):
-                            batch = all_records_to_insert[i:i+batch_size_for_db]
-                            
-                            if batch:
-                                try:
-                                    response = supabase.table(TABLE_NAME).insert(batch).execute()
-                                    if hasattr(response, 'data') and response.data:
-                                        success_count += len(batch)
-                                except Exception as e:
-                                    st.error(f"Error inserting records batch: {str(e)}")
-                            
-                            progress_value = min(1.0, min(i + batch_size_for_db, len(all_records_to_insert)) / max(1, len(all_records_to_insert)))
-                            progress_bar.progress(progress_value)
-                            status_text.text(f"Inserted {success_count} of {len(all_records_to_insert)} new records...")
+                        success_count = batch_client.write_rows(
+                            TABLE_NAME, all_records_to_insert,
+                            on_error=lambda batch, e: st.error(f"Error inserting records batch: {str(e)}"),
+                            on_progress=lambda done, total: progress_bar.progress(min(1.0, done / max(1, total)))
+                        )
+                        status_text.text(f"Inserted {success_count} of {len(all_records_to_insert)} new records...")
                     
                     update_count = 0
                     if all_records_to_update:
                         status_text.text("Updating existing records...")
                         progress_bar.progress(0)
                         
-                        for i, record in enumerate(all_records_to_update):
-                            record_id = record.pop('id')
-                            
-                            try:
-                                response = supabase.table(TABLE_NAME).update(record).eq('id', record_id).execute()
-                                if hasattr(response, 'data') and response.data:
-                                    update_count += 1
-                            except Exception as e:
-                                st.error(f"Error updating record {record_id}: {str(e)}")
-                            
-                            progress_value = min(1.0, (i + 1) / len(all_records_to_update))
-                            progress_bar.progress(progress_value)
-                            status_text.text(f"Updated {update_count} of {len(all_records_to_update)} existing records...")
+                        # Upsert on id: diff_records already matched account_number to the existing row's id
+                        update_count = batch_client.write_rows(
+                            TABLE_NAME, all_records_to_update, upsert=True, on_conflict='id',
+                            on_error=lambda batch, e: st.error(f"Error updating records batch: {str(e)}"),
+                            on_progress=lambda done, total: progress_bar.progress(min(1.0, done / max(1, total)))
+                        )
+                        status_text.text(f"Updated {update_count} of {len(all_records_to_update)} existing records...")
+                    
+                    unchanged_count = total_records - len(all_records_to_insert) - len(all_records_to_update)
+                    st.info(f"{success_count} inserted, {update_count} updated, {unchanged_count} unchanged.")
                     
                     total_processed = success_count + update_count
                     if total_processed > 0:
@@ -808,14 +675,11 @@ def main():
         if upload_madrid_daily is not None:
             sp_madrid_daily = upload_madrid_daily.getvalue()
 
-            template_stream = io.BytesIO(sp_madrid_daily)
-            template_xls = pd.ExcelFile(template_stream)
-            template_sheets = template_xls.sheet_names
+            template_sheets = get_sheet_names(sp_madrid_daily)
 
             selected_template_sheet = st.sidebar.selectbox("Select a sheet from the SP Madrid Daily Template", template_sheets)
 
-            template_stream.seek(0)
-            template_df_preview = pd.read_excel(template_stream, sheet_name=selected_template_sheet, header=1)
+            template_df_preview = read_excel_cached(sp_madrid_daily, sheet_name=selected_template_sheet, header=1)
             available_columns = list(template_df_preview.columns)
 
             selected_date_column = st.sidebar.selectbox("Select the column to insert 'Date + Remark'", available_columns)
@@ -862,9 +726,7 @@ def main():
         file_buffer = io.BytesIO(file_content)
                 
         try:
-            file_buffer.seek(0) 
-            xlsx = pd.ExcelFile(file_buffer)
-            sheet_names = xlsx.sheet_names
+            sheet_names = get_sheet_names(file_content)
             is_encrypted = False
             decrypted_file = file_buffer
 
@@ -891,8 +753,7 @@ def main():
                     office_file.decrypt(decrypted_file)
                     decrypted_file.seek(0)
 
-                    xlsx = pd.ExcelFile(decrypted_file)
-                    sheet_names = xlsx.sheet_names
+                    sheet_names = get_sheet_names(decrypted_file)
                     
                 except Exception as decrypt_error:
                     st.sidebar.error(f"Decryption failed: {str(decrypt_error)}")
@@ -913,10 +774,9 @@ def main():
         
         try:
             if is_encrypted:
-                decrypted_file.seek(0)
-                df = pd.read_excel(decrypted_file, sheet_name=selected_sheet)
+                df = read_excel_cached(decrypted_file, sheet_name=selected_sheet)
             else:
-                df = pd.read_excel(xlsx, sheet_name=selected_sheet)
+                df = read_excel_cached(file_content, sheet_name=selected_sheet)
                 
             if selected_sheet and preview:
                 st.subheader(f"Preview of {selected_sheet}")
@@ -1263,8 +1123,7 @@ def main():
                             st.session_state['output_binary'] = output_binary
                             st.session_state['output_filename'] = output_filename
                             
-                            excel_file = pd.ExcelFile(io.BytesIO(output_binary))
-                            result_sheet_names = excel_file.sheet_names
+                            result_sheet_names = get_sheet_names(output_binary)
                             st.session_state['result_sheet_names'] = result_sheet_names
                         
                         else:
@@ -1574,7 +1433,6 @@ def main():
                         "cms"
                     )
         elif 'output_binary' in st.session_state and 'result_sheet_names' in st.session_state:
-            excel_file = pd.ExcelFile(io.BytesIO(st.session_state['output_binary']))
             result_sheet_names = st.session_state['result_sheet_names']
             
             if len(result_sheet_names) > 1:
@@ -1587,7 +1445,7 @@ def main():
             else: 
                 result_sheet = result_sheet_names[0]
             
-            selected_df = pd.read_excel(io.BytesIO(st.session_state['output_binary']), sheet_name=result_sheet)
+            selected_df = read_excel_cached(st.session_state['output_binary'], sheet_name=result_sheet)
 
             st.subheader("Processed Preview")
             st.dataframe(selected_df, use_container_width=True)
@@ -1,25 +1,392 @@
-import streamlit as st
 import pandas as pd
+import numpy as np
 import os
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Border, Side
 from openpyxl.utils import get_column_letter
+from pandas.tseries.api import guess_datetime_format
 from datetime import datetime, date
 import io
 import tempfile
 import shutil
 import re 
+import hashlib
+import threading
+import warnings
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from copy import copy
+from urllib.parse import quote
+from processor.xlsx_patch import CellMapTemplate
+from processor.reporting import StreamlitSink
 
 #Supabase
 from supabase import create_client
 from dotenv import load_dotenv
 load_dotenv()
 
+WORKBOOK_CACHE_SIZE = 8
+
+SUPABASE_MAX_WORKERS = 8
+SUPABASE_MAX_RETRIES = 3
+SUPABASE_RETRY_BACKOFF = 0.5
+SUPABASE_MAX_URL_LENGTH = 6000
+SUPABASE_MAX_BATCH = 200
+SUPABASE_PAGE_SIZE = 1000
+SUPABASE_WRITE_BATCH = 500
+
+REFERENCE_TABLE_TTL = 300
+
+THIN_BORDER = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin'),
+)
+
+_workbook_cache = OrderedDict()
+_workbook_cache_lock = threading.Lock()
+
+def _content_bytes(file_content):
+    if isinstance(file_content, bytes):
+        return file_content
+    if hasattr(file_content, 'getvalue'):
+        return file_content.getvalue()
+    if isinstance(file_content, (str, os.PathLike)):
+        with open(file_content, 'rb') as f:
+            return f.read()
+    file_content.seek(0)
+    return file_content.read()
+
+def _copy_frames(result):
+    if isinstance(result, dict):
+        return {name: frame.copy() for name, frame in result.items()}
+    return result.copy()
+
+def _workbook_entry(data):
+    """Return the cache entry for a workbook, keyed by the hash of its content."""
+    key = hashlib.sha1(data).hexdigest()
+    with _workbook_cache_lock:
+        entry = _workbook_cache.get(key)
+        if entry is not None:
+            _workbook_cache.move_to_end(key)
+            return entry
+
+    xls = pd.ExcelFile(io.BytesIO(data))
+    entry = {'sheet_names': xls.sheet_names, 'frames': {}, 'lock': threading.Lock()}
+    xls.close()
+
+    with _workbook_cache_lock:
+        entry = _workbook_cache.setdefault(key, entry)
+        _workbook_cache.move_to_end(key)
+        while len(_workbook_cache) > WORKBOOK_CACHE_SIZE:
+            _workbook_cache.popitem(last=False)
+    return entry
+
+def get_sheet_names(file_content):
+    """Sheet names of an uploaded workbook, parsed once per distinct file content."""
+    return list(_workbook_entry(_content_bytes(file_content))['sheet_names'])
+
+def read_excel_cached(file_content, sheet_name=0, **read_kwargs):
+    """
+    Read a sheet into a DataFrame, parsing each (file, sheet, options) only once.
+
+    Preview, processing and Streamlit reruns all hand in the same upload bytes, so
+    they share one parse. Callers get a copy and are free to modify it.
+    """
+    data = _content_bytes(file_content)
+    entry = _workbook_entry(data)
+    frame_key = (sheet_name, repr(sorted(read_kwargs.items())))
+
+    with entry['lock']:
+        result = entry['frames'].get(frame_key)
+        if result is None:
+            result = pd.read_excel(io.BytesIO(data), sheet_name=sheet_name, **read_kwargs)
+            entry['frames'][frame_key] = result
+
+    return _copy_frames(result)
+
+_template_cache = {}
+_template_cache_lock = threading.Lock()
+
+def _template_entry(path):
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _template_cache_lock:
+        entry = _template_cache.get(path)
+        if entry is None or entry['version'] != version:
+            with open(path, 'rb') as template_file:
+                data = template_file.read()
+            workbook = load_workbook(io.BytesIO(data))
+            entry = {
+                'version': version,
+                'data': data,
+                'values': list(workbook.active.values),
+            }
+            _template_cache[path] = entry
+        return entry
+
+_reference_table_cache = {}
+_reference_table_generation = {}
+_reference_table_lock = threading.Lock()
+
+def _as_text(values):
+    return pd.Series(values, dtype=object).map(str).str.strip().to_numpy()
+
+def _mobile_phone_rule(text):
+    digits = text.str.replace(r'\D', '', regex=True)
+    is_mobile = (digits.str.len() >= 10) & (digits.str[-10] == '9')
+    return digits.where(~is_mobile, '0' + digits.str[-10:])
+
+def _rob_bike_phone_rule(text):
+    digits = pd.Series([''.join(c for c in phone if c.isdigit()) for phone in text.str.split('/').str[0]],
+                       index=text.index, dtype=object)
+    length = digits.str.len()
+    digits = pd.Series(np.select(
+        [(length >= 10) & digits.str.startswith('63'),
+         (length >= 10) & digits.str.startswith('0') & ~digits.str.startswith('09'),
+         (length >= 10) & digits.str.startswith('9')],
+        ['0' + digits.str[2:], '09' + digits.str[-8:], '0' + digits],
+        default=digits
+    ), index=text.index, dtype=object)
+    length = digits.str.len()
+    short = (length < 11) & (length > 0)
+    return pd.Series(np.select(
+        [length > 11,
+         short & digits.str.startswith('09'),
+         short & (length >= 9),
+         short],
+        [digits.str[:11],
+         digits.str.pad(11, side='right', fillchar='0'),
+         '09' + digits.str[-9:],
+         '09' + digits.str.pad(9, side='right', fillchar='0')],
+        default=digits
+    ), index=text.index, dtype=object)
+
+PHONE_RULES = {
+    'mobile': _mobile_phone_rule,
+    'rob_bike': _rob_bike_phone_rule,
+}
+
+def diff_records(incoming_df, existing_df, key, id_column='id'):
+    """
+    Split incoming rows against existing database rows with one hash join on key.
+
+    Returns (to_insert, to_update, unchanged) DataFrames in incoming order. to_update
+    carries id_column from the first existing row with the same key. A row counts as
+    changed when any column the two frames share differs after str() and strip(),
+    the same comparison the upload flows made record by record.
+    """
+    incoming_df = incoming_df.reset_index(drop=True)
+    if existing_df.empty or key not in existing_df.columns:
+        to_update = incoming_df.iloc[0:0].copy()
+        to_update[id_column] = pd.Series(dtype=object)
+        return incoming_df, to_update, incoming_df.iloc[0:0]
+
+    existing_first = existing_df.drop_duplicates(key, keep='first')
+    positions = pd.Index(existing_first[key]).get_indexer(incoming_df[key])
+    matched = positions >= 0
+    existing_rows = existing_first.iloc[positions[matched]]
+
+    changed = np.zeros(matched.sum(), dtype=bool)
+    for col in incoming_df.columns:
+        if col in existing_df.columns:
+            changed |= _as_text(incoming_df[col].to_numpy()[matched]) != _as_text(existing_rows[col].astype(object))
+
+    update_mask = np.zeros(len(incoming_df), dtype=bool)
+    update_mask[np.flatnonzero(matched)[changed]] = True
+
+    to_update = incoming_df[update_mask].copy()
+    to_update[id_column] = pd.Series(existing_rows[id_column].to_numpy()[changed].tolist(), index=to_update.index, dtype=object)
+    return incoming_df[~matched].copy(), to_update, incoming_df[matched & ~update_mask].copy()
+
+class SupabaseBatchClient:
+    """
+    Batched `in_` lookups against Supabase, run concurrently on a bounded thread pool.
+
+    Batches are cut so the request URL stays under max_url_length, and reads and
+    upserts are retried with exponential backoff before they are reported as failed.
+    Plain inserts are sent once: a retry after a lost response could insert the batch
+    twice. Progress and error callbacks run on the calling thread, so they can safely
+    update Streamlit.
+    """
+    def __init__(self, supabase, max_workers=SUPABASE_MAX_WORKERS, max_retries=SUPABASE_MAX_RETRIES,
+                 backoff=SUPABASE_RETRY_BACKOFF, max_url_length=SUPABASE_MAX_URL_LENGTH,
+                 max_batch=SUPABASE_MAX_BATCH, write_batch_size=SUPABASE_WRITE_BATCH):
+        self.supabase = supabase
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_url_length = max_url_length
+        self.max_batch = max_batch
+        self.write_batch_size = write_batch_size
+        self.url_prefix_length = len(str(getattr(supabase, 'rest_url', None) or os.getenv("SUPABASE_URL") or ""))
+
+    def split_batches(self, table, column, values, select='*'):
+        overhead = self.url_prefix_length + len(table) + len(quote(select)) + len(column) + 32
+        batches, batch, length = [], [], overhead
+        for value in values:
+            size = len(quote(f'"{value}"', safe='')) + 3
+            if batch and (length + size > self.max_url_length or len(batch) >= self.max_batch):
+                batches.append(batch)
+                batch, length = [], overhead
+            batch.append(value)
+            length += size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def execute(self, build_query, retry=True):
+        """Run build_query().execute(), retrying with backoff only when retry is set (idempotent requests)."""
+        if not retry:
+            return build_query().execute()
+        for attempt in range(self.max_retries + 1):
+            try:
+                return build_query().execute()
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def run_batches(self, batches, run, on_error=None, on_progress=None):
+        """
+        Run run(batch) for every batch on the pool and return the results in batch order.
+        A batch that still fails after retries raises, unless on_error(batch, error) is
+        given, in which case its result is None.
+        """
+        results = [None] * len(batches)
+        if not batches:
+            return results
+
+        total = sum(len(batch) for batch in batches)
+        done = 0
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            futures = {executor.submit(run, batch): idx for idx, batch in enumerate(batches)}
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    results[idx] = future.result()
+                except Exception as e:
+                    if on_error is None:
+                        for pending in futures:
+                            pending.cancel()
+                        raise
+                    on_error(batches[idx], e)
+                done += len(batches[idx])
+                if on_progress:
+                    on_progress(done, total)
+        return results
+
+    def fetch_in(self, table, column, values, select='*', on_error=None, on_progress=None,
+                 page_size=None, order=(), unique_column='id'):
+        """
+        Return every row of table whose column is in values, as a list of dicts.
+        Blank and duplicate values are dropped before batching.
+
+        When one value can match many rows, pass page_size (the server's max rows)
+        so full pages are followed with range requests. Pages are ordered by the
+        order columns and then by unique_column, since offset paging over tied rows
+        can repeat or skip rows at page boundaries.
+        """
+        values = [value for value in dict.fromkeys(values) if value is not None and value != '']
+        batches = self.split_batches(table, column, values, select)
+        if page_size and unique_column and unique_column not in order:
+            order = tuple(order) + (unique_column,)
+
+        def build_query(batch, start=None):
+            query = self.supabase.table(table).select(select).in_(column, batch)
+            for order_column in order:
+                query = query.order(order_column)
+            if start is not None:
+                query = query.range(start, start + page_size - 1)
+            return query
+
+        def run(batch):
+            if not page_size:
+                return self.execute(lambda: build_query(batch)).data or []
+            rows = []
+            while True:
+                page = self.execute(lambda: build_query(batch, len(rows))).data or []
+                rows.extend(page)
+                if len(page) < page_size:
+                    return rows
+
+        results = self.run_batches(batches, run, on_error, on_progress)
+        return [record for result in results if result for record in result]
+
+    def fetch_table(self, table, select='*', order=(), ttl=REFERENCE_TABLE_TTL):
+        """
+        Return every row of a small reference table. Results are shared by every session
+        in the process for ttl seconds; call invalidate_table after writing to the table.
+        """
+        key = (table, select, tuple(order))
+        with _reference_table_lock:
+            entry = _reference_table_cache.get(key)
+            if entry is not None and time.monotonic() - entry['loaded'] < ttl:
+                return list(entry['rows'])
+            generation = _reference_table_generation.get(table, 0)
+
+        def build_query(start):
+            query = self.supabase.table(table).select(select)
+            for order_column in order:
+                query = query.order(order_column)
+            return query.range(start, start + SUPABASE_PAGE_SIZE - 1)
+
+        rows = []
+        while True:
+            page = self.execute(lambda: build_query(len(rows))).data or []
+            rows.extend(page)
+            if len(page) < SUPABASE_PAGE_SIZE:
+                break
+
+        with _reference_table_lock:
+            if _reference_table_generation.get(table, 0) == generation:
+                _reference_table_cache[key] = {'rows': rows, 'loaded': time.monotonic()}
+        return list(rows)
+
+    def invalidate_table(self, table):
+        """Drop cached copies of table so the next fetch_table reads it again."""
+        with _reference_table_lock:
+            _reference_table_generation[table] = _reference_table_generation.get(table, 0) + 1
+            for key in [key for key in _reference_table_cache if key[0] == table]:
+                del _reference_table_cache[key]
+
+    def write_rows(self, table, rows, upsert=False, on_conflict='id', batch_size=None,
+                   on_error=None, on_progress=None):
+        """
+        Insert rows, or upsert them on on_conflict, in concurrent batches.
+        Every row in one call should carry the same keys. Upserts are retried like
+        reads; inserts are not idempotent and go out once. Returns the number of rows
+        the server reports as written.
+        """
+        batch_size = batch_size or self.write_batch_size
+        batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+
+        def run(batch):
+            if upsert:
+                build_query = lambda: self.supabase.table(table).upsert(batch, on_conflict=on_conflict)
+            else:
+                build_query = lambda: self.supabase.table(table).insert(batch)
+            return len(self.execute(build_query, retry=upsert).data or [])
+
+        results = self.run_batches(batches, run, on_error, on_progress)
+        return sum(result for result in results if result)
+
 class BaseProcessor:
-    def __init__(self):
+    phone_rules = 'mobile'
+
+    def __init__(self, sink=None):
+        # Errors, warnings and notes go through the sink, so the same processor can
+        # run under Streamlit, in a batch job (LoggingSink) or in tests (CollectingSink)
+        self.sink = sink or StreamlitSink()
         self.temp_dir = tempfile.mkdtemp()
 
         SUPABASE_URL = os.getenv("SUPABASE_URL")
         SUPABASE_KEY = os.getenv("SUPABASE_KEY")
         self.supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        self.batch_client = SupabaseBatchClient(self.supabase)
         
     def __del__(self):
         try:
@@ -28,6 +395,9 @@ class BaseProcessor:
         except:
             pass
           
+    def read_sheet(self, file_content, sheet_name=0, **read_kwargs):
+        return read_excel_cached(file_content, sheet_name=sheet_name, **read_kwargs)
+
     def process_mobile_number(self, mobile_num):
         if pd.isna(mobile_num) or mobile_num is None or str(mobile_num).strip() == "":
             return ""
@@ -57,6 +427,56 @@ class BaseProcessor:
 
         return mobile_num
 
+    def template_bytes(self, path):
+        """
+        Raw bytes of a report template, validated with openpyxl on first use.
+        Templates are read once per process and re-read when the file changes.
+        """
+        return _template_entry(path)['data']
+
+    def template_values(self, path):
+        return _template_entry(path)['values']
+
+    def load_template(self, path):
+        """
+        A fresh workbook of the template for one output. Only the disk read is
+        cached: every call parses the cached bytes again, because openpyxl
+        workbooks don't survive copy.deepcopy or pickling intact and each
+        output fills its own workbook.
+        """
+        return load_workbook(io.BytesIO(self.template_bytes(path)))
+
+    def cell_map_template(self, path, cells, number_formats=None, autofit=False):
+        """
+        A CellMapTemplate for outputs that only fill a fixed set of cells, compiled
+        once per template version and shared like the template bytes.
+        """
+        entry = _template_entry(path)
+        key = (tuple(cells), tuple(sorted((number_formats or {}).items())), autofit)
+        with _template_cache_lock:
+            compiled = entry.setdefault('cell_maps', {}).get(key)
+            if compiled is None:
+                compiled = CellMapTemplate(entry['data'], cells, number_formats, autofit)
+                entry['cell_maps'][key] = compiled
+        return compiled
+
+    def normalize_phones(self, series, rules=None):
+        """
+        Normalize a whole phone column at once with the campaign's PHONE_RULES
+        ('mobile' matches process_mobile_number, 'rob_bike' matches
+        ROBBikeProcessor.clean_phone_number). Each distinct value is worked out once.
+        """
+        rule = PHONE_RULES[rules or self.phone_rules]
+        values = series.astype(object)
+        missing = (values.isna() | (values == 'nan')).to_numpy()
+        text = values.where(~missing, '').astype(str)
+
+        uniques = pd.Series(text.unique(), dtype=object)
+        normalized = rule(uniques).to_numpy(dtype=object)
+        result = normalized[pd.Index(uniques).get_indexer(text)]
+        result[missing] = ''
+        return pd.Series(result, index=series.index)
+
     def format_date(self, date_value):
         if pd.isna(date_value) or date_value is None:
             return ""
@@ -69,6 +489,148 @@ class BaseProcessor:
             return date_obj.strftime("%m/%d/%Y")
         except:
             return str(date_value)
+
+    def format_dates(self, series, date_format="%m/%d/%Y", na_value=None, unparsed=None):
+        """
+        Format a whole date column, parsing each distinct value once.
+
+        datetime64 columns are formatted directly. Strings are parsed in bulk with the
+        format guessed from the column's first string; a value keeps that parse only if
+        formatting it back reproduces the text, otherwise it goes through pd.to_datetime
+        on its own. Missing values become na_value, and values that do not parse are
+        passed to unparsed (left as they are by default).
+        """
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series.dt.strftime(date_format).astype(object).where(series.notna(), na_value)
+
+        values = series.astype(object).to_numpy()
+        missing = pd.isna(values)
+        memo = {}
+        strings = []
+        for value in values[~missing]:
+            key = (type(value), value)
+            if key in memo:
+                continue
+            memo[key] = None
+            if isinstance(value, str):
+                strings.append(value)
+            elif isinstance(value, (datetime, date)):
+                try:
+                    memo[key] = pd.Timestamp(value).strftime(date_format)
+                except Exception:
+                    pass
+
+        if strings:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                guessed = guess_datetime_format(strings[0])
+            if guessed and not ('%d' in guessed and '%m' in guessed and guessed.index('%d') < guessed.index('%m')):
+                text = pd.Series(strings, dtype=object)
+                try:
+                    parsed = pd.to_datetime(text, format=guessed, errors='coerce')
+                    verified = parsed.notna() & (parsed.dt.strftime(guessed) == text)
+                    for value, formatted in zip(text[verified], parsed[verified].dt.strftime(date_format)):
+                        memo[(str, value)] = formatted
+                except (ValueError, TypeError):
+                    pass
+
+        for key, formatted in memo.items():
+            if formatted is None:
+                try:
+                    memo[key] = pd.to_datetime(key[1]).strftime(date_format)
+                except Exception:
+                    memo[key] = key[1] if unparsed is None else unparsed(key[1])
+
+        result = [na_value if is_missing else memo[(type(value), value)] for value, is_missing in zip(values, missing)]
+        return pd.Series(result, index=series.index, dtype=object)
+
+    def column_widths(self, df, columns=None, sample=None, padding=2):
+        """
+        Column widths measured on the DataFrame rather than on worksheet cells:
+        the longest str() of any filled value or of the header, plus padding.
+        With sample set, frames longer than that are measured on a random sample
+        of that many rows.
+        Returns {1-based column position: width}.
+        """
+        if sample and len(df) > sample:
+            df = df.sample(n=sample, random_state=0)
+        widths = {}
+        for idx, col in enumerate(df.columns):
+            if columns is not None and col not in columns:
+                continue
+            values = df.iloc[:, idx]
+            values = values[values.notna()]
+            longest = values.astype(str).str.len().max() if len(values) > 0 else 0
+            widths[idx + 1] = int(max(longest, len(str(col)))) + padding
+        return widths
+
+    def autofit_columns(self, worksheet, df, columns=None, sample=None, first_column=1):
+        for position, width in self.column_widths(df, columns, sample).items():
+            worksheet.column_dimensions[get_column_letter(position + first_column - 1)].width = width
+
+    def export_excel(self, df, sheet_name='Sheet1', text_columns=(), date_columns=None,
+                     number_formats=None, border=False, autofit=False, autofit_sample=None):
+        """
+        Write a DataFrame to xlsx bytes through a write-only workbook.
+
+        Formatting is declared per column instead of patched cell by cell afterwards:
+            text_columns    written as text with the '@' number format
+            date_columns    {column: strftime format}, converted before writing
+            number_formats  {column: number format}, e.g. {'PAST DUE': '0.00'}
+            border          thin border on every data cell
+            autofit         True to size every column, or a list of columns to size
+            autofit_sample  measure widths on at most this many rows
+        Styles are built once per column and copied onto each cell.
+        """
+        date_columns = date_columns or {}
+        number_formats = number_formats or {}
+        if autofit is True:
+            autofit = list(df.columns)
+
+        values = df.astype(object).where(df.notna(), None)
+        columns = list(values.columns)
+
+        for idx, col in enumerate(columns):
+            if col in date_columns:
+                values.isetitem(idx, self.format_dates(df.iloc[:, idx], date_columns[col]))
+            if col in text_columns:
+                column = values.iloc[:, idx].copy()
+                filled = (column.notna() & (column != "")).to_numpy()
+                column[filled] = [str(v) for v in column[filled]]
+                values.isetitem(idx, column)
+
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet(sheet_name)
+
+        if autofit:
+            self.autofit_columns(worksheet, values, autofit, autofit_sample)
+
+        styles = []
+        for idx, col in enumerate(columns):
+            number_format = '@' if col in text_columns else number_formats.get(col)
+            if number_format is None and not border:
+                continue
+            prototype = WriteOnlyCell(worksheet)
+            if number_format is not None:
+                prototype.number_format = number_format
+            if border:
+                prototype.border = THIN_BORDER
+            styles.append((idx, prototype._style))
+
+        worksheet.append(columns)
+        for row in values.itertuples(index=False, name=None):
+            if styles:
+                row = list(row)
+                for idx, style in styles:
+                    cell = WriteOnlyCell(worksheet, value=row[idx])
+                    cell._style = copy(style)
+                    row[idx] = cell
+            worksheet.append(row)
+
+        output = io.BytesIO()
+        workbook.save(output)
+        return output.getvalue()
+
     def clean_data(self, df, remove_duplicates=False, remove_blanks=False, trim_spaces=False):
         if not isinstance(df, pd.DataFrame):
             raise ValueError(f"Expected a pandas DataFrame, but got {type(df)}: {df}")
@@ -89,12 +651,8 @@ class BaseProcessor:
     def clean_only(self, file_content, sheet_name, preview_only=False, 
                    remove_duplicates=False, remove_blanks=False, trim_spaces=False, file_name=None):
         try:
-            if isinstance(file_content, bytes):
-                file_content = io.BytesIO(file_content)
-                
-            xls = pd.ExcelFile(file_content)
-            sheet_names = xls.sheet_names
-            df = pd.read_excel(xls, sheet_name=sheet_names[0])
+            sheet_names = get_sheet_names(file_content)
+            df = self.read_sheet(file_content, sheet_name=sheet_names[0])
 
             cleaned_df = self.clean_data(df, remove_duplicates, remove_blanks, trim_spaces)
 
@@ -107,25 +665,10 @@ class BaseProcessor:
             else:
                 output_filename = "CLEANED_DATA.xlsx"
 
-            output_path = os.path.join(self.temp_dir, output_filename)
-
-            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                cleaned_df.to_excel(writer, index=False, sheet_name='Sheet1')
-                worksheet = writer.sheets['Sheet1']
-                for i, col in enumerate(cleaned_df.columns):
-                    try:
-                        max_len_in_column = cleaned_df[col].astype(str).map(len).max()
-                        max_length = max(max_len_in_column, len(str(col))) + 2
-                    except:
-                        max_length = 15
-                    col_letter = get_column_letter(i + 1)
-                    worksheet.column_dimensions[col_letter].width = max_length
-
-            with open(output_path, 'rb') as f:
-                output_binary = f.read()
+            output_binary = self.export_excel(cleaned_df, autofit=True)
 
             return cleaned_df, output_binary, output_filename
 
         except Exception as e:
-            st.error(f"Error cleaning file: {str(e)}")
+            self.sink.error(f"Error cleaning file: {str(e)}")
             raise
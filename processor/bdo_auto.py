@@ -1,26 +1,252 @@
-import streamlit as st
 import pandas as pd
 import os
 import numpy as np
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Border, Side
-from openpyxl import load_workbook
 from datetime import datetime
 import pytz
 import io
 import re 
 import zipfile
+import pickle
+import hashlib
+import threading
 from processor.base import BaseProcessor as base
 from supabase import create_client
 from dotenv import load_dotenv
 load_dotenv()
 
+REFERENCE_SNAPSHOT = ".reference_snapshot.pkl"
+REFERENCE_SNAPSHOT_FORMAT = 1
+
+BANK_STATUS_FILE = "BANK_STATUS.xlsx"
+RFD_LIST_FILE = "RFD_LISTS.xlsx"
+BUCKET_AGENT_FILES = {
+    "Bucket 1": "BUCKET1_AGENT.xlsx",
+    "Bucket 2": "BUCKET2_AGENT.xlsx",
+    "Bucket 5&6": "BUCKET5&6_AGENT.xlsx",
+}
+
+PRODUCTIVITY_CELLS = ('C2', 'F8', 'G8', 'K8', 'K9', 'L8', 'C13')
+
+SHARED_AGENTS = ["SYSTEM", "LCMANZANO", "ACALVAREZ", "DSDEGUZMAN", "SRELIOT", "TANAZAIRE", "SPMADRID"]
+BUCKET_CARD_PREFIXES = {
+    "Bucket 1": ("01",),
+    "Bucket 2": ("02",),
+    "Bucket 5&6": ("05", "06"),
+}
+
+RFD_PATTERN = re.compile(r"RFD:\s*(\S+)$")
+RFD_BACKSLASH_PATTERN = re.compile(r"\\\s*(\S+)")
+
+_reference_cache = {}
+_reference_cache_lock = threading.Lock()
+
+def _reference_sources():
+    return [BANK_STATUS_FILE, RFD_LIST_FILE, *BUCKET_AGENT_FILES.values()]
+
+def _reference_versions(base_dir):
+    versions = {}
+    for name in _reference_sources():
+        path = os.path.join(base_dir, name)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            versions[name] = (stat.st_mtime_ns, stat.st_size)
+        else:
+            versions[name] = None
+    return versions
+
+def _reference_hashes(base_dir, versions):
+    hashes = {}
+    for name, version in versions.items():
+        if version is None:
+            hashes[name] = None
+        else:
+            with open(os.path.join(base_dir, name), 'rb') as source:
+                hashes[name] = hashlib.sha1(source.read()).hexdigest()
+    return hashes
+
+def compile_reference_data(base_dir):
+    """
+    Compile the database/bdo_auto workbooks into the lookups the daily report uses.
+
+    bank_status and rfd_codes are None when the file is missing or lacks its
+    columns. buckets has no entry for a missing agent file and None for one
+    without VOLARE USER / FULL NAME.
+    """
+    reference = {'bank_status': None, 'rfd_codes': None, 'buckets': {}}
+    
+    bank_status_path = os.path.join(base_dir, BANK_STATUS_FILE)
+    if os.path.exists(bank_status_path):
+        df_bank_status = pd.read_excel(bank_status_path)
+        if "CMS STATUS" in df_bank_status.columns and "BANK STATUS" in df_bank_status.columns:
+            reference['bank_status'] = dict(zip(df_bank_status["CMS STATUS"].astype(str).str.strip(), 
+                                                df_bank_status["BANK STATUS"].astype(str).str.strip()))
+    
+    rfd_path = os.path.join(base_dir, RFD_LIST_FILE)
+    if os.path.exists(rfd_path):
+        df_rfd_list = pd.read_excel(rfd_path)
+        if "RFD CODE" in df_rfd_list.columns:
+            reference['rfd_codes'] = set(df_rfd_list["RFD CODE"].astype(str).str.upper())
+    
+    for bucket_name, file_name in BUCKET_AGENT_FILES.items():
+        bucket_path = os.path.join(base_dir, file_name)
+        if not os.path.exists(bucket_path):
+            continue
+        df_bucket = pd.read_excel(bucket_path)
+        if "VOLARE USER" not in df_bucket.columns or "FULL NAME" not in df_bucket.columns:
+            reference['buckets'][bucket_name] = None
+            continue
+        users = df_bucket["VOLARE USER"].astype(str).str.strip()
+        full_names = df_bucket["FULL NAME"].astype(str).str.strip()
+        reference['buckets'][bucket_name] = {
+            'users': users,
+            'full_names': dict(zip(users, full_names)),
+        }
+    
+    return reference
+
+def load_reference_data(base_dir):
+    """
+    Compiled reference data for base_dir, kept in memory and in a pickle snapshot
+    beside the workbooks so new sessions skip the Excel parsing. The snapshot is
+    reused while every source keeps its mtime and size, or failing that its content
+    hash, and is rebuilt as soon as one changes.
+    """
+    versions = _reference_versions(base_dir)
+    with _reference_cache_lock:
+        cached = _reference_cache.get(base_dir)
+        if cached is not None and cached['versions'] == versions:
+            return cached['reference']
+        
+        snapshot_path = os.path.join(base_dir, REFERENCE_SNAPSHOT)
+        snapshot = None
+        if os.path.exists(snapshot_path):
+            try:
+                with open(snapshot_path, 'rb') as snapshot_file:
+                    snapshot = pickle.load(snapshot_file)
+                if snapshot.get('format') != REFERENCE_SNAPSHOT_FORMAT:
+                    snapshot = None
+            except Exception:
+                snapshot = None
+        
+        if snapshot is not None and snapshot['versions'] != versions:
+            hashes = _reference_hashes(base_dir, versions)
+            if snapshot['hashes'] == hashes:
+                snapshot['versions'] = versions
+                _write_reference_snapshot(snapshot_path, snapshot)
+            else:
+                snapshot = None
+        
+        if snapshot is None:
+            snapshot = {
+                'format': REFERENCE_SNAPSHOT_FORMAT,
+                'versions': versions,
+                'hashes': _reference_hashes(base_dir, versions),
+                'reference': compile_reference_data(base_dir),
+            }
+            _write_reference_snapshot(snapshot_path, snapshot)
+        
+        _reference_cache[base_dir] = snapshot
+        return snapshot['reference']
+
+def _write_reference_snapshot(snapshot_path, snapshot):
+    try:
+        temp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as snapshot_file:
+            pickle.dump(snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, snapshot_path)
+    except OSError:
+        pass
+
+def extract_rfd(remarks, valid_codes):
+    """
+    RFD code of each remark, or NaN when it is not in valid_codes.
+
+    Takes the code after a trailing "RFD:", else the word after the last
+    backslash, else the last word of the remark (after trailing backslashes are
+    stripped), upper-cased.
+    """
+    text = remarks.astype(object).map(str).str.strip().str.rstrip("\\")
+    rfd = text.str.extract(RFD_PATTERN, expand=False)
+    rfd = rfd.fillna(text.str.findall(RFD_BACKSLASH_PATTERN).str[-1])
+    rfd = rfd.fillna(text.str.split().str[-1]).str.upper()
+    return rfd.where(rfd.isin(valid_codes))
+
+def default_rfd(rfd, status):
+    """
+    Fill RFD codes from the bank status in one pass: PTP rows without a code or
+    with NISV/NABZ become BUSY, CALL NO PTP without a code NISV, UNCON without a
+    code NABZ.
+    """
+    missing = rfd.isna()
+    return pd.Series(np.select(
+        [(status == "PTP") & (missing | rfd.isin(["NISV", "NABZ"])),
+         (status == "CALL NO PTP") & missing,
+         (status == "UNCON") & missing],
+        ["BUSY", "NISV", "NABZ"],
+        default=rfd.astype(object)
+    ), index=rfd.index)
+
+def partition_buckets(df_main, buckets, bank_status_lookup):
+    """
+    Split the remark dump into one frame per bucket in a single pass.
+
+    Dates and bank status are resolved once for the whole dump. A row belongs to
+    a bucket when its Remark By is one of the bucket's agents; agents shared
+    between buckets (SHARED_AGENTS) only count where the card number carries the
+    bucket's prefix. Agent membership is worked out on the distinct agents and
+    broadcast back to the rows, so a row can still land in several buckets.
+    """
+    # assign leaves df_main alone and, under copy-on-write, shares every column
+    # it doesn't replace; the bucket frames below are only read
+    df = df_main.assign(
+        **{col: pd.to_datetime(df_main[col], errors='coerce') for col in ["PTP Date", "Claim Paid Date", "Date"]},
+        **{"BANK STATUS": df_main["Status"].astype(str).str.strip().map(bank_status_lookup)}
+    )
+    
+    agent_codes, agents = pd.factorize(df["Remark By"], use_na_sentinel=False)
+    shared = np.asarray(agents.isin(SHARED_AGENTS))[agent_codes]
+    card = df["Card No."].astype(str)
+    
+    bucket_dfs = {}
+    for bucket_name, bucket_agents in buckets.items():
+        in_bucket = np.asarray(agents.isin(bucket_agents['users']))[agent_codes]
+        prefixes = BUCKET_CARD_PREFIXES.get(bucket_name)
+        if prefixes:
+            in_bucket &= ~shared | card.str.startswith(prefixes).to_numpy(dtype=bool)
+        
+        matched_df = df[in_bucket]
+        if not matched_df.empty:
+            bucket_dfs[bucket_name] = matched_df.assign(**{
+                "HANDLING OFFICER2": matched_df["Remark By"].map(bucket_agents['full_names'])
+            })
+    return bucket_dfs
+
+def backfill_system_officer(officers, group_keys=None):
+    """
+    Replace "SYSTEM" handling officers with the nearest earlier non-SYSTEM officer.
+
+    Rows are taken in order; SYSTEM rows with nothing before them stay SYSTEM.
+    With group_keys (e.g. the PN column) the earlier officer must belong to the
+    same group.
+    """
+    values = officers.to_numpy()
+    is_system = (officers == "SYSTEM").to_numpy()
+    positions = np.arange(len(values))
+    if group_keys is None:
+        source = np.maximum.accumulate(np.where(is_system, -1, positions)) if len(values) else positions
+    else:
+        source = pd.Series(np.where(is_system, np.nan, positions), index=officers.index)
+        source = source.groupby(group_keys.to_numpy(), sort=False).ffill().fillna(-1).to_numpy(dtype=int)
+    fill = is_system & (source >= 0)
+    result = values.copy()
+    result[fill] = values[source[fill]]
+    return pd.Series(result, index=officers.index, dtype=officers.dtype)
 
 class BDOAutoProcessor(base):
     def process_agency_daily_report(self, file_content, sheet_name=None, preview_only=False,
         remove_duplicates=False, remove_blanks=False, trim_spaces=False, report_date=None,
         kept_count_b5=None, kept_bal_b5=None, alloc_bal_b5=None,
-        kept_count_b6=None, kept_bal_b6=None, alloc_bal_b6=None):
+        kept_count_b6=None, kept_bal_b6=None, alloc_bal_b6=None, backfill_by_account=False):
 
         try:
             DIR = os.getcwd()
@@ -31,49 +257,30 @@ class BDOAutoProcessor(base):
             vs_report_template = os.path.join(TEMPLATE_DIR, "SPMADRID VS REPORT TEMPLATE.xlsx")
             
             if not os.path.exists(daily_report_template):
-                st.error(f"Template file not found: {daily_report_template}")
+                self.sink.error(f"Template file not found: {daily_report_template}")
                 return None, None, None
                 
             if not os.path.exists(daily_productivity_template):
-                st.error(f"Template file not found: {daily_productivity_template}")
+                self.sink.error(f"Template file not found: {daily_productivity_template}")
                 return None, None, None
                 
-            try:
-                with open(daily_report_template, 'rb') as template_file:
-                    template_copy = io.BytesIO(template_file.read())
+            for template_path, template_label in ((daily_report_template, "daily report"),
+                                                  (daily_productivity_template, "daily productivity")):
                 try:
-                    test_wb = load_workbook(template_copy)
-                    test_wb.close()
+                    self.template_bytes(template_path)
                 except zipfile.BadZipFile:
-                    st.error(f"Template file is not a valid Excel file: {daily_report_template}")
+                    self.sink.error(f"Template file is not a valid Excel file: {template_path}")
                     return None, None, None
-            except Exception as e:
-                st.error(f"Error opening daily report template file: {str(e)}")
-                return None, None, None
-                
-            try:
-                with open(daily_productivity_template, 'rb') as template_file:
-                    template_copy = io.BytesIO(template_file.read())
-                try:
-                    test_wb = load_workbook(template_copy)
-                    test_wb.close()
-                except zipfile.BadZipFile:
-                    st.error(f"Template file is not a valid Excel file: {daily_productivity_template}")
+                except Exception as e:
+                    self.sink.error(f"Error opening {template_label} template file: {str(e)}")
                     return None, None, None
-            except Exception as e:
-                st.error(f"Error opening daily productivity template file: {str(e)}")
-                return None, None, None
             
             BASE_DIR = os.path.join(DIR, "database", "bdo_auto")
             
-            bucket_paths = {
-                "Bucket 1": os.path.join(BASE_DIR, "BUCKET1_AGENT.xlsx"),
-                "Bucket 2": os.path.join(BASE_DIR, "BUCKET2_AGENT.xlsx"),
-                "Bucket 5&6": os.path.join(BASE_DIR, "BUCKET5&6_AGENT.xlsx")
-            }
+            bucket_paths = {bucket_name: os.path.join(BASE_DIR, file_name) for bucket_name, file_name in BUCKET_AGENT_FILES.items()}
         
-            bank_status_path = os.path.join(BASE_DIR, "BANK_STATUS.xlsx")
-            rfd_list = os.path.join(BASE_DIR, "RFD_LISTS.xlsx")
+            bank_status_path = os.path.join(BASE_DIR, BANK_STATUS_FILE)
+            rfd_list = os.path.join(BASE_DIR, RFD_LIST_FILE)
             
             required_columns = [
                 "Date", "Debtor", "Account No.", "Card No.", "Remark", "Remark By",
@@ -81,38 +288,31 @@ class BDOAutoProcessor(base):
                 "Balance", "Status"
             ]
             
-            bank_status_lookup = {}
-            if os.path.exists(bank_status_path):
-                df_bank_status = pd.read_excel(bank_status_path)
-                if "CMS STATUS" not in df_bank_status.columns or "BANK STATUS" not in df_bank_status.columns:
-                    st.error("Missing 'CMS STATUS' or 'BANK STATUS' column in BANK_STATUS.xlsx.")
-                    return None, None, None
-                bank_status_lookup = dict(zip(df_bank_status["CMS STATUS"].astype(str).str.strip(), 
-                                            df_bank_status["BANK STATUS"].astype(str).str.strip()))
-            else:
-                st.error(f"Missing file: {bank_status_path}")
+            reference = load_reference_data(BASE_DIR)
+            
+            if not os.path.exists(bank_status_path):
+                self.sink.error(f"Missing file: {bank_status_path}")
+                return None, None, None
+            bank_status_lookup = reference['bank_status']
+            if bank_status_lookup is None:
+                self.sink.error("Missing 'CMS STATUS' or 'BANK STATUS' column in BANK_STATUS.xlsx.")
                 return None, None, None
                 
-            rfd_valid_codes = set()
-            if os.path.exists(rfd_list):
-                df_rfd_list = pd.read_excel(rfd_list)
-                if "RFD CODE" not in df_rfd_list.columns:
-                    st.error("Missing 'RFD CODE' column in RFD_LISTS.xlsx.")
-                    return None, None, None
-                rfd_valid_codes = set(df_rfd_list["RFD CODE"].astype(str).str.upper())
-            else:
-                st.error(f"Missing file: {rfd_list}")
+            if not os.path.exists(rfd_list):
+                self.sink.error(f"Missing file: {rfd_list}")
+                return None, None, None
+            rfd_valid_codes = reference['rfd_codes']
+            if rfd_valid_codes is None:
+                self.sink.error("Missing 'RFD CODE' column in RFD_LISTS.xlsx.")
                 return None, None, None
                 
-            byte_stream = io.BytesIO(file_content)
-            xls = pd.ExcelFile(byte_stream)
-            df_main = pd.read_excel(xls, sheet_name=sheet_name, dtype={"Account No.": str})
+            df_main = self.read_sheet(file_content, sheet_name=sheet_name, dtype={"Account No.": str})
             
             df_main = self.clean_data(df_main, remove_duplicates, remove_blanks, trim_spaces)
             
             missing_columns = [col for col in required_columns if col not in df_main.columns]
             if missing_columns:
-                st.error(f"Required columns not found in the uploaded file: {', '.join(missing_columns)}")
+                self.sink.error(f"Required columns not found in the uploaded file: {', '.join(missing_columns)}")
                 return None, None, None
                 
             df_main = df_main[required_columns]
@@ -126,83 +326,17 @@ class BDOAutoProcessor(base):
             
             df_main = df_main[~df_main["Card No."].isin([f"ch{i}" for i in range(1, 20)])]
             
-            bucket_dfs = {}
+            available_buckets = {}
             for bucket_name, bucket_path in bucket_paths.items():
-                if os.path.exists(bucket_path):
-                    df_bucket = pd.read_excel(bucket_path)
-                    if "VOLARE USER" not in df_bucket.columns or "FULL NAME" not in df_bucket.columns:
-                        st.warning(f"{bucket_name} missing required columns. Skipping.")
+                if os.path.exists(bucket_path) and bucket_name in reference['buckets']:
+                    if reference['buckets'][bucket_name] is None:
+                        self.sink.warning(f"{bucket_name} missing required columns. Skipping.")
                         continue
-                        
-                    df_bucket["VOLARE USER"] = df_bucket["VOLARE USER"].astype(str).str.strip()
-                    df_bucket["FULL NAME"] = df_bucket["FULL NAME"].astype(str).str.strip()
-                    lookup_dict = dict(zip(df_bucket["VOLARE USER"], df_bucket["FULL NAME"]))
-                    
-                    matched_df = df_main[df_main["Remark By"].isin(df_bucket["VOLARE USER"])].copy()
-                    matched_df["HANDLING OFFICER2"] = matched_df["Remark By"].map(lookup_dict)
-                    
-                    if bucket_name == "Bucket 1":
-                        matched_df = matched_df[
-                            (matched_df["Remark By"].isin(["SYSTEM", "LCMANZANO", "ACALVAREZ", "DSDEGUZMAN", "SRELIOT", "TANAZAIRE", "SPMADRID"]) &
-                            matched_df["Card No."].astype(str).str.startswith("01")) |
-                            (~matched_df["Remark By"].isin(["SYSTEM", "LCMANZANO", "ACALVAREZ", "DSDEGUZMAN", "SRELIOT", "TANAZAIRE", "SPMADRID"]))
-                        ]
-                    elif bucket_name == "Bucket 2":
-                        matched_df = matched_df[
-                            (matched_df["Remark By"].isin(["SYSTEM", "LCMANZANO", "ACALVAREZ", "DSDEGUZMAN", "SRELIOT", "TANAZAIRE", "SPMADRID"]) &
-                            matched_df["Card No."].astype(str).str.startswith("02")) |
-                            (~matched_df["Remark By"].isin(["SYSTEM", "LCMANZANO", "ACALVAREZ", "DSDEGUZMAN", "SRELIOT", "TANAZAIRE", "SPMADRID"]))
-                        ]
-                    elif bucket_name == "Bucket 5&6":
-                        matched_df = matched_df[
-                            (matched_df["Remark By"].isin(["SYSTEM", "LCMANZANO", "ACALVAREZ", "DSDEGUZMAN", "SRELIOT", "TANAZAIRE", "SPMADRID"]) &
-                            matched_df["Card No."].astype(str).str.startswith(("05", "06"))) |
-                            (~matched_df["Remark By"].isin(["SYSTEM", "LCMANZANO", "ACALVAREZ", "DSDEGUZMAN", "SRELIOT", "TANAZAIRE", "SPMADRID"]))
-                        ]
-                    
-                    for col in ["PTP Date", "Claim Paid Date", "Date"]:
-                        matched_df[col] = pd.to_datetime(matched_df[col], errors='coerce')
-                    
-                    matched_df["BANK STATUS"] = matched_df["Status"].astype(str).str.strip().map(bank_status_lookup)
-                    
-                    if not matched_df.empty:
-                        bucket_dfs[bucket_name] = matched_df
-                else:
-                    st.error(f"Missing file: {bucket_path}")
-            
-            def extract_and_validate_rfd(remark):
-                remark = str(remark).strip().rstrip("\\")
-                rfd_match = re.search(r"RFD:\s*(\S+)$", remark)
-                if rfd_match:
-                    rfd = rfd_match.group(1).upper()
+                    available_buckets[bucket_name] = reference['buckets'][bucket_name]
                 else:
-                    last_word = re.findall(r"\\\s*(\S+)", remark)
-                    if last_word:
-                        rfd = last_word[-1].upper()
-                    else:
-                        last_word = remark.split()[-1] if remark else np.nan
-                        rfd = last_word.upper() if last_word else np.nan
-                return rfd if rfd in rfd_valid_codes else np.nan
+                    self.sink.error(f"Missing file: {bucket_path}")
             
-            def autofit_worksheet_columns(ws):
-                for col in ws.columns:
-                    max_length = 0
-                    col_letter = get_column_letter(col[0].column)
-                    for cell in col:
-                        try:
-                            if cell.value:
-                                max_length = max(max_length, len(str(cell.value)))
-                        except:
-                            pass
-                    adjusted_width = max_length + 2
-                    ws.column_dimensions[col_letter].width = adjusted_width
-            
-            def get_merged_cell_top_left(ws, cell_ref):
-                """Find the top-left cell of a merged range containing the given cell_ref."""
-                for merged_range in ws.merged_cells.ranges:
-                    if cell_ref in merged_range:
-                        return merged_range.min_row, merged_range.min_col
-                return None, None  
+            bucket_dfs = partition_buckets(df_main, available_buckets, bank_status_lookup)
             
             processed_dfs = {}
             for bucket_name, bucket_df in bucket_dfs.items():
@@ -225,20 +359,17 @@ class BDOAutoProcessor(base):
                         np.where(bucket_df["Claim Paid Amount"].isna() | (bucket_df["Claim Paid Amount"] == 0), np.nan, bucket_df["Claim Paid Amount"]),
                         bucket_df["PTP Amount"]
                     ),
-                    "RFD5": bucket_df["Remark"].apply(extract_and_validate_rfd)
+                    "RFD5": extract_rfd(bucket_df["Remark"], rfd_valid_codes)
                 })
                 
                 filtered_df.reset_index(drop=True, inplace=True)
                 
-                for i in range(1, len(filtered_df)):
-                    if filtered_df.loc[i, "HANDLING OFFICER2"] == "SYSTEM":
-                        filtered_df.loc[i, "HANDLING OFFICER2"] = filtered_df.loc[i-1, "HANDLING OFFICER2"]
-                
-                filtered_df.loc[filtered_df["RFD5"].isna() & (filtered_df["STATUS4"] == "PTP"), "RFD5"] = "BUSY"
-                filtered_df.loc[filtered_df["RFD5"].isna() & (filtered_df["STATUS4"] == "CALL NO PTP"), "RFD5"] = "NISV"
-                filtered_df.loc[filtered_df["RFD5"].isna() & (filtered_df["STATUS4"] == "UNCON"), "RFD5"] = "NABZ"
+                filtered_df["HANDLING OFFICER2"] = backfill_system_officer(
+                    filtered_df["HANDLING OFFICER2"],
+                    group_keys=filtered_df["PN"] if backfill_by_account else None
+                )
                 
-                filtered_df.loc[(filtered_df["STATUS4"] == "PTP") & ((filtered_df["RFD5"] == "NISV") | (filtered_df["RFD5"] == "NABZ")), "RFD5"] = "BUSY"
+                filtered_df["RFD5"] = default_rfd(filtered_df["RFD5"], filtered_df["STATUS4"])
                 
                 filtered_df['STATUS4'] = filtered_df['STATUS4'].replace('nan', np.nan)
                 
@@ -281,13 +412,14 @@ class BDOAutoProcessor(base):
                 
                 output_files = {}
                 productivity_files = {}
+                productivity_template = self.cell_map_template(
+                    daily_productivity_template, PRODUCTIVITY_CELLS, number_formats={'G8': "0.00"}, autofit=True
+                )
                 b5_prod_df = None
                 b6_prod_df = None
                 
-                template_wb = load_workbook(daily_report_template)
-                
                 if not bucket5_df.empty:
-                    wb5 = load_workbook(daily_report_template)
+                    wb5 = self.load_template(daily_report_template)
                     ws5 = wb5.active
                     
                     headers = bucket5_df.columns.tolist()
@@ -298,7 +430,7 @@ class BDOAutoProcessor(base):
                         for c_idx, value in enumerate(row, 1):
                             ws5.cell(row=r_idx, column=c_idx, value=value)
                     
-                    autofit_worksheet_columns(ws5)
+                    self.autofit_columns(ws5, bucket5_df)
                     
                     output_b5 = io.BytesIO()
                     wb5.save(output_b5)
@@ -306,15 +438,6 @@ class BDOAutoProcessor(base):
                     b5_binary = output_b5
                     output_files["B5"] = b5_binary.getvalue()
                     
-                    wb5_prod = load_workbook(daily_productivity_template)
-                    ws5_prod = wb5_prod.active
-                    
-                    row, col = get_merged_cell_top_left(ws5_prod, 'C2')
-                    if row and col:
-                        ws5_prod.cell(row=row, column=col, value=current_date_formatted)
-                    else:
-                        ws5_prod['C2'] = current_date_formatted
-                    
                     ptp_rows_b5 = bucket5_df[bucket5_df["STATUS4"] == "PTP"]
                     ptp_count_b5 = len(ptp_rows_b5)
                     ptp_balance_sum_b5 = ptp_rows_b5["BALANCE"].sum() if ptp_count_b5 > 0 else 0.0
@@ -328,23 +451,18 @@ class BDOAutoProcessor(base):
                         "Allocation Balance": [alloc_bal_b5]
                     })
                     
-                    ws5_prod['F8'] = ptp_count_b5
-                    ws5_prod['G8'] = ptp_balance_sum_b5
-                    ws5_prod['G8'].number_format = "0.00"
-                    ws5_prod["K8"] = kept_count_b5
-                    ws5_prod["K9"] = kept_count_b5
-                    ws5_prod["L8"] = kept_bal_b5
-                    ws5_prod["C13"] = alloc_bal_b5
-
-                    autofit_worksheet_columns(ws5_prod)
-                    
-                    output_b5_prod = io.BytesIO()
-                    wb5_prod.save(output_b5_prod)
-                    output_b5_prod.seek(0)
-                    productivity_files["B5"] = output_b5_prod.getvalue()
+                    productivity_files["B5"] = productivity_template.render({
+                        'C2': current_date_formatted,
+                        'F8': ptp_count_b5,
+                        'G8': ptp_balance_sum_b5,
+                        'K8': kept_count_b5,
+                        'K9': kept_count_b5,
+                        'L8': kept_bal_b5,
+                        'C13': alloc_bal_b5,
+                    })
                     
                 if not bucket6_df.empty:
-                    wb6 = load_workbook(daily_report_template)
+                    wb6 = self.load_template(daily_report_template)
                     ws6 = wb6.active
                     
                     headers = bucket6_df.columns.tolist()
@@ -355,7 +473,7 @@ class BDOAutoProcessor(base):
                         for c_idx, value in enumerate(row, 1):
                             ws6.cell(row=r_idx, column=c_idx, value=value)
                     
-                    autofit_worksheet_columns(ws6)
+                    self.autofit_columns(ws6, bucket6_df)
                     
                     output_b6 = io.BytesIO()
                     wb6.save(output_b6)
@@ -363,15 +481,6 @@ class BDOAutoProcessor(base):
                     b6_binary = output_b6
                     output_files["B6"] = b6_binary.getvalue()
                     
-                    wb6_prod = load_workbook(daily_productivity_template)
-                    ws6_prod = wb6_prod.active
-                    
-                    row, col = get_merged_cell_top_left(ws6_prod, 'C2')
-                    if row and col:
-                        ws6_prod.cell(row=row, column=col, value=current_date_formatted)
-                    else:
-                        ws6_prod['C2'] = current_date_formatted
-                    
                     ptp_rows_b6 = bucket6_df[bucket6_df["STATUS4"] == "PTP"]
                     ptp_count_b6 = len(ptp_rows_b6)
                     ptp_balance_sum_b6 = ptp_rows_b6["BALANCE"].sum() if ptp_count_b6 > 0 else 0.0
@@ -385,25 +494,17 @@ class BDOAutoProcessor(base):
                         "Allocation Balance": [alloc_bal_b6]
                     })
                     
-                    ws6_prod['F8'] = ptp_count_b6
-                    ws6_prod['G8'] = ptp_balance_sum_b6
-                    ws6_prod['G8'].number_format = "0.00"
-                    ws6_prod["K8"] = kept_count_b6
-                    ws6_prod["K9"] = kept_count_b6
-                    ws6_prod["L8"] = kept_bal_b6
-                    ws6_prod["C13"] = alloc_bal_b6
-
-                    autofit_worksheet_columns(ws6_prod)
-                    
-                    output_b6_prod = io.BytesIO()
-                    wb6_prod.save(output_b6_prod)
-                    output_b6_prod.seek(0)
-                    productivity_files["B6"] = output_b6_prod.getvalue()
+                    productivity_files["B6"] = productivity_template.render({
+                        'C2': current_date_formatted,
+                        'F8': ptp_count_b6,
+                        'G8': ptp_balance_sum_b6,
+                        'K8': kept_count_b6,
+                        'K9': kept_count_b6,
+                        'L8': kept_bal_b6,
+                        'C13': alloc_bal_b6,
+                    })
                                         
-                    vs_report_wb = load_workbook(vs_report_template)
-                    vs_report_ws = vs_report_wb.active
-
-                    data = list(vs_report_ws.values)
+                    data = self.template_values(vs_report_template)
                     if data:
                         headers = data[0]
                         rows = data[1:]
@@ -411,10 +512,7 @@ class BDOAutoProcessor(base):
                     else:
                         vs_df = pd.DataFrame()
 
-                    output_vs_report = io.BytesIO()
-                    vs_report_wb.save(output_vs_report)
-                    output_vs_report.seek(0)
-                    vs_binary = output_vs_report
+                    vs_binary = io.BytesIO(self.template_bytes(vs_report_template))
                     
                 
                 combined_output = io.BytesIO()
@@ -463,7 +561,7 @@ class BDOAutoProcessor(base):
             return None, None, None
             
         except Exception as e:
-            st.error(f"Error processing agency daily report: {str(e)}")
+            self.sink.error(f"Error processing agency daily report: {str(e)}")
             return None, None, None
 
     def process_new_endorsement(self, file_content, sheet_name=None, preview_only=False,
@@ -472,13 +570,8 @@ class BDOAutoProcessor(base):
         TABLE_NAME = 'bdo_auto_loan_dataset'
         all_account_numbers = []
         try:
-            if isinstance(file_content, bytes):
-                file_content = io.BytesIO(file_content)
-
-            xls = pd.ExcelFile(file_content)
-
-            df = pd.read_excel(
-                xls,
+            df = self.read_sheet(
+                file_content,
                 sheet_name=sheet_name,
                 dtype={'PN': str}
             )
@@ -497,7 +590,7 @@ class BDOAutoProcessor(base):
             missing_columns = [col for col in required_columns if col not in df.columns]
 
             if missing_columns:
-                st.error(f"Required columns not found in the uploaded file: {', '.join(missing_columns)}")
+                self.sink.error(f"Required columns not found in the uploaded file: {', '.join(missing_columns)}")
                 return None, None, None
             else:
                 manila_timezone = pytz.timezone('Asia/Manila')
@@ -529,7 +622,7 @@ class BDOAutoProcessor(base):
                     bcrm_endo_df['Customer Name'] = df['COMPLETE_NAME']
                 
                 if 'MOBILE NUMBER' in df.columns:
-                    bcrm_endo_df['Mobile'] = df['MOBILE NUMBER'].apply(self.process_mobile_number)
+                    bcrm_endo_df['Mobile'] = self.normalize_phones(df['MOBILE NUMBER'])
 
                 if 'ADDRESS' in df.columns:
                     bcrm_endo_df['Home address'] = df['ADDRESS']
@@ -560,7 +653,7 @@ class BDOAutoProcessor(base):
                 elif 'ACCOUNT NUMBER' in df.columns:
                     cms_endo_df['Account Number'] = df['ACCOUNT NUMBER'].astype(str)
                 else:
-                    st.error("Missing 'PN' or 'ACCOUNT NUMBER' column in the uploaded file.")
+                    self.sink.error("Missing 'PN' or 'ACCOUNT NUMBER' column in the uploaded file.")
                     return None, None, None
 
                 account_numbers = cms_endo_df['Account Number'].astype(str).str.strip()
@@ -581,7 +674,7 @@ class BDOAutoProcessor(base):
                 if 'Due Date' in df.columns:
                     cms_endo_df['Due Date'] = pd.to_datetime(df['Due Date']).dt.strftime('%m/%d/%Y')
                 if 'MOBILE NUMBER' in df.columns:
-                    cms_endo_df['Contact Number'] = df['MOBILE NUMBER'].apply(self.process_mobile_number)
+                    cms_endo_df['Contact Number'] = self.normalize_phones(df['MOBILE NUMBER'])
                 if 'Email Address' in df.columns:
                     cms_endo_df['EMAIL'] = df['Email Address']
                 if 'Model' in df.columns:
@@ -591,21 +684,13 @@ class BDOAutoProcessor(base):
 
                 unique_account_numbers = list(dict.fromkeys(all_account_numbers))  
                 if unique_account_numbers:
-                    batch_size_for_query = 20
+                    records = self.batch_client.fetch_in(
+                        TABLE_NAME, "account_number", unique_account_numbers, select="account_number, chcode",
+                        on_error=lambda batch_ids, e: self.sink.warning(f"Error fetching Ch Code batch of {len(batch_ids)}: {str(e)}. Continuing...")
+                    )
                     chcode_map = {}
-                    
-                    for i in range(0, len(unique_account_numbers), batch_size_for_query):
-                        batch_ids = unique_account_numbers[i:i+batch_size_for_query]
-                        batch_ids = [id for id in batch_ids if id is not None and id != '']
-                        
-                        if batch_ids:
-                            try:
-                                batch_response = self.supabase.table(TABLE_NAME).select("account_number, chcode").in_("account_number", batch_ids).execute()
-                                if hasattr(batch_response, 'data') and batch_response.data:
-                                    for record in batch_response.data:
-                                        chcode_map[str(record['account_number']).strip()] = str(record['chcode']).strip()
-                            except Exception as e:
-                                st.warning(f"Error fetching Ch Code batch {i}: {str(e)}. Continuing...")
+                    for record in records:
+                        chcode_map[str(record['account_number']).strip()] = str(record['chcode']).strip()
                     
                     cms_endo_df['Ch Code'] = cms_endo_df['Account Number'].apply(lambda x: chcode_map.get(str(x).strip(), ""))
 
@@ -622,40 +707,13 @@ class BDOAutoProcessor(base):
                 }
 
         except Exception as e:
-            st.error(f"Error processing new endorsement: {str(e)}")
+            self.sink.error(f"Error processing new endorsement: {str(e)}")
             return None, None, None
 
     def create_excel_in_memory(self, df):
-        output = io.BytesIO()
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Sheet1')
-
-            workbook = writer.book
-            worksheet = writer.sheets['Sheet1']
-            final_columns = df.columns
-
-            thin_border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-
-            for i, col in enumerate(final_columns):
-                if col in ['Due Date', 'Last Payment', 'ENDO DATE']:
-                    col_letter = get_column_letter(i + 1)
-
-                    for row in range(2, len(df) + 2):
-                        cell = worksheet[f"{col_letter}{row}"]
-                        if cell.value is not None:
-                            try:
-                                date_value = pd.to_datetime(cell.value).strftime("%m/%d/%Y")
-                                cell.value = date_value
-                                cell.number_format = '@'
-                            except:
-                                pass
-
-        output.seek(0)
-        return output.getvalue()
-
+        date_columns = ['Due Date', 'Last Payment', 'ENDO DATE']
+        return self.export_excel(
+            df,
+            text_columns=date_columns,
+            date_columns={col: "%m/%d/%Y" for col in date_columns},
+        )
@@ -1,14 +1,39 @@
-import streamlit as st
 import pandas as pd
 import os
+import time
+import numpy as np
 import openpyxl
-from openpyxl.utils import get_column_letter
-from datetime import datetime, date, time
-import io
+from datetime import datetime, date
 import tempfile
 import shutil
 from processor.base import BaseProcessor
 
+CURED_LIST_COLUMNS = 43
+
+CURED_REMARKS_COLUMNS = ["LAN", "Action Status", "Remark Date", "PTP Date", "Reason For Default", 
+                         "Field Visit Date", "Remark", "Next Call Date", "PTP Amount", "Claim Paid Amount", 
+                         "Remark By", "Phone No.", "Relation", "Claim Paid Date"]
+CURED_REMARKS_TEXT_COLUMNS = ["Remark Date", "PTP Date", "Claim Paid Date"]
+
+def as_exported(df):
+    """The frame as it reads back from its exported sheet: blank cells become NaN."""
+    return df.where(df.notna() & (df.astype(object) != ""), np.nan).infer_objects()
+
+def parse_cured_date(value):
+    """Date part of a cured-list payment date, or None when it can't be read."""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for date_format in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(value), date_format).date()
+        except ValueError:
+            pass
+    return None
+
 class BPIAutoCuringProcessor(BaseProcessor):
     
     def setup_directories(self, automation_type):
@@ -35,10 +60,7 @@ class BPIAutoCuringProcessor(BaseProcessor):
         try:
             original_file_content = file_content
             
-            if isinstance(file_content, bytes):
-                file_content = io.BytesIO(file_content)
-            xls = pd.ExcelFile(file_content)
-            df = pd.read_excel(xls, sheet_name=sheet_name)
+            df = self.read_sheet(file_content, sheet_name=sheet_name)
             
             required_columns = [
                 'LAN', 'NAME', 'CTL4', 'PAST DUE', 'PAYOFF AMOUNT', 
@@ -48,7 +70,7 @@ class BPIAutoCuringProcessor(BaseProcessor):
             
             missing_columns = [col for col in required_columns if col not in df.columns]
             if missing_columns:
-                st.error("Required columns not found in the uploaded file.")
+                self.sink.error("Required columns not found in the uploaded file.")
                 return None, None, None
             
             df = self.clean_data(df, remove_duplicates, remove_blanks, trim_spaces)
@@ -98,9 +120,9 @@ class BPIAutoCuringProcessor(BaseProcessor):
             for orig_col, new_col in column_map.items():
                 if orig_col in df.columns:
                     if orig_col == 'CONTACT NUMBER 1' or orig_col == 'CONTACT NUMBER 2':
-                        result_df[new_col] = df[orig_col].apply(lambda x: "" if pd.isna(x) else self.process_mobile_number(x))
+                        result_df[new_col] = self.normalize_phones(df[orig_col])
                     elif orig_col == 'ENDO DATE':
-                        result_df[new_col] = df[orig_col].apply(lambda x: self.format_date(x) if pd.notnull(x) else "")
+                        result_df[new_col] = self.format_dates(df[orig_col], na_value="", unparsed=str)
                     else:
                         result_df[new_col] = df[orig_col].fillna("")
                 else:
@@ -130,47 +152,20 @@ class BPIAutoCuringProcessor(BaseProcessor):
             return result_df, output_binary, output_filename
             
         except Exception as e:
-            st.error(f"Error processing file: {str(e)}")
+            self.sink.error(f"Error processing file: {str(e)}")
             raise
 
     def create_excel_in_memory(self, df, columns=None, numeric_cols=None):
         """
         Create an Excel file in memory with proper formatting
         """
-        output = io.BytesIO()
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Sheet1')
-            
-            worksheet = writer.sheets['Sheet1']
-            final_columns = columns if columns is not None else df.columns
-            
-            for i, col in enumerate(final_columns):
-                max_length = max(
-                    df[col].astype(str).map(len).max() if len(df) > 0 else 0,
-                    len(col)
-                ) + 2
-                col_letter = chr(65 + i) 
-                worksheet.column_dimensions[col_letter].width = max_length
-                
-                if numeric_cols and col in numeric_cols:
-                    for row in range(2, len(df) + 2):
-                        cell = worksheet[f"{col_letter}{row}"]
-                        cell.number_format = '0.00'
-                
-                if col == 'DATE REFERRED':
-                    for row in range(2, len(df) + 2):
-                        cell = worksheet[f"{col_letter}{row}"]
-                        value = cell.value
-                        if value:
-                            try: 
-                                cell.value = pd.to_datetime(value).strftime("%m/%d/%Y")
-                                cell.number_format = '@'
-                            except:
-                                pass
-        
-        output.seek(0)
-        return output.getvalue()
+        return self.export_excel(
+            df if columns is None else df[list(columns)],
+            text_columns=['DATE REFERRED'],
+            date_columns={'DATE REFERRED': "%m/%d/%Y"},
+            number_formats={col: '0.00' for col in numeric_cols or []},
+            autofit=True,
+        )
 
     def process_updates(self, file_content, sheet_name=None, preview_only=False,
                         remove_duplicates=False, remove_blanks=False, trim_spaces=False):
@@ -182,6 +177,145 @@ class BPIAutoCuringProcessor(BaseProcessor):
         return self.process_updates_or_uploads(file_content, sheet_name, 'uploads', preview_only,
                                                remove_duplicates, remove_blanks, trim_spaces)
     
+    def scan_cured_list(self, input_file):
+        """
+        Read the cured list in a single streaming pass.
+
+        The workbook is opened read-only and every row is visited once: rows are
+        grouped into nego / PTP / SPMADRID, the per-barcode index is built and
+        only the columns used by the remarks, reshuffle and payments outputs are kept.
+
+        Each barcode_index entry holds the remark data of the last row with that
+        barcode and, under 'remark_by', the collector of the first such row.
+        """
+        source_wb = openpyxl.load_workbook(input_file, read_only=True)
+        try:
+            ws = source_wb.active
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, ())
+            max_column = max(ws.max_column or 0, len(header))
+            
+            cured = {
+                'header': header,
+                'barcodes': [],
+                'payments': [],
+                'barcode_index': {},
+                'nego': [],
+                'ptp': [],
+                'spmadrid': [],
+            }
+            
+            for values in rows:
+                if len(values) < CURED_LIST_COLUMNS:
+                    max_column = max(max_column, len(values))
+                    values = tuple(values) + (None,) * (CURED_LIST_COLUMNS - len(values))
+                
+                barcode, collector, paid_date, amount = values[0], values[1], values[2], values[3]
+                remark_status = values[7]
+                
+                cured['barcodes'].append(barcode)
+                cured['payments'].append((values[16], values[17], amount, paid_date))
+                
+                if collector == "SPMADRID":
+                    cured['spmadrid'].append(barcode)
+                elif remark_status is not None and "PTP" in str(remark_status):
+                    cured['ptp'].append(barcode)
+                else:
+                    cured['nego'].append(barcode)
+                
+                entry = cured['barcode_index'].get(barcode)
+                if entry is None:
+                    entry = cured['barcode_index'][barcode] = {'remark_by': collector}
+                
+                if barcode:
+                    entry.update({
+                        'date': paid_date,
+                        'amount': amount,
+                        'collector': collector,
+                        'phone1': str(values[41]).strip() if values[41] else "",
+                        'phone2': str(values[42]).strip() if values[42] else "",
+                    })
+        finally:
+            source_wb.close()
+        
+        if max_column < CURED_LIST_COLUMNS:
+            raise ValueError("File doesn't have the expected number of columns")
+        
+        return cured
+    
+    def build_cured_remarks(self, cured):
+        """
+        Build the REMARKS sheet as a DataFrame from a scan_cured_list result.
+
+        Every group is fanned out into one block per action status (nego x3,
+        PTP x2, SPMADRID x2) and the remark columns are derived column-wise from
+        the barcode index instead of cell by cell.
+        """
+        barcodes = []
+        statuses = []
+        for group, action_statuses in (
+            ('nego', ["PTP NEW - CALL OUTS_PASTDUE", "PTP FF UP - CLIENT ANSWERED AND WILL SETTLE", "PAYMENT - CURED"]),
+            ('ptp', ["PTP FF UP - CLIENT ANSWERED AND WILL SETTLE", "PAYMENT - CURED"]),
+            ('spmadrid', ["PTP NEW - CURED_GHOST", "PAYMENT - CURED"]),
+        ):
+            for action_status in action_statuses:
+                barcodes.extend(cured[group])
+                statuses.extend([action_status] * len(cured[group]))
+        
+        remarks_df = pd.DataFrame({col: pd.Series([None] * len(barcodes), dtype=object) for col in CURED_REMARKS_COLUMNS})
+        remarks_df['LAN'] = pd.Series(barcodes, dtype=object)
+        remarks_df['Action Status'] = pd.Series(statuses, dtype=object)
+        if remarks_df.empty:
+            return remarks_df
+        
+        lookup = pd.DataFrame.from_dict(
+            {barcode: entry for barcode, entry in cured['barcode_index'].items() if barcode},
+            orient='index', columns=['date', 'amount', 'collector', 'phone1', 'phone2'], dtype=object
+        )
+        for col in ('phone1', 'phone2'):
+            lookup[col] = self.normalize_phones(lookup[col]).astype(object)
+        lookup['phone'] = lookup['phone1'].where(lookup['phone1'].astype(bool), lookup['phone2'])
+        
+        parsed_dates = {value: parse_cured_date(value) for value in lookup['date'].unique()}
+        lookup['paid_date'] = lookup['date'].map(parsed_dates)
+        
+        matched = lookup.reindex(pd.Index(barcodes, dtype=object))
+        matched.index = remarks_df.index
+        matched = matched.astype(object).where(matched.notna(), None)
+        
+        action_status = remarks_df['Action Status']
+        is_ptp_new = action_status.str.contains("PTP NEW", regex=False)
+        is_ptp_ff = action_status.str.contains("PTP FF", regex=False)
+        is_payment = action_status.str.contains("PAYMENT", regex=False)
+        
+        has_date = matched['date'].map(bool)
+        remark_day = pd.to_datetime(matched['paid_date'].where(matched['paid_date'].notna(), datetime.now().date()))
+        remark_time = np.select(
+            [is_ptp_new, is_ptp_ff, action_status.str.contains("CURED", regex=False)],
+            [pd.Timedelta(hours=14, minutes=40), pd.Timedelta(hours=14, minutes=50), pd.Timedelta(hours=15)],
+            default=pd.Timedelta(0)
+        )
+        remark_date = remark_day.dt.normalize() + pd.to_timedelta(remark_time)
+        remarks_df['Remark Date'] = remark_date.dt.strftime("%m/%d/%Y %I:%M:%S %p").where(has_date, "")
+        remarks_df['PTP Date'] = remark_date.dt.strftime("%m/%d/%Y").where(has_date, "")
+        
+        # Barcodes missing from the index (blank LANs) keep the old f-string rendering of None
+        phone = matched['phone'].fillna("None").astype(str)
+        remarks_df['Remark'] = np.select(
+            [is_ptp_new, is_ptp_ff, is_payment],
+            ["1_" + phone + " - PTP NEW", phone + " - FPTP", "CURED - CONFIRM VIA SELECTIVE LIST"],
+            default=""
+        )
+        remarks_df['PTP Amount'] = matched['amount'].where(~is_payment, "")
+        remarks_df['Claim Paid Amount'] = matched['amount'].where(is_payment, "")
+        remarks_df['Remark By'] = matched['collector']
+        remarks_df['Phone No.'] = matched['phone'].where(~is_payment, "")
+        
+        paid_date = pd.to_datetime(matched['paid_date']).dt.strftime("%m/%d/%Y").fillna("")
+        remarks_df['Claim Paid Date'] = paid_date.where(is_payment & has_date, "")
+        
+        return remarks_df
+    
     def process_cured_list(self, file_content, sheet_name=None, preview_only=False,
                            remove_duplicates=False, remove_blanks=False, trim_spaces=False):
         def is_file_locked(file_path):
@@ -191,9 +325,8 @@ class BPIAutoCuringProcessor(BaseProcessor):
             except (PermissionError, OSError):
                 return True
 
-        def try_process(temp_path):
-            xls = pd.ExcelFile(temp_path)
-            df = pd.read_excel(xls, sheet_name=sheet_name)
+        def try_process():
+            df = self.read_sheet(file_content, sheet_name=sheet_name)
             return self.clean_data(df, remove_duplicates, remove_blanks, trim_spaces)
 
         with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as temp_input:
@@ -202,20 +335,20 @@ class BPIAutoCuringProcessor(BaseProcessor):
 
         try:
             if is_file_locked(temp_input_path):
-                print("File is currently in use. Attempting to retry...")
+                self.sink.warning("File is currently in use. Attempting to retry...")
                 time.sleep(0.5)
                 try:
                     os.remove(temp_input_path)
-                    print("Removed locked temp file. Retrying...")
+                    self.sink.info("Removed locked temp file. Retrying...")
                 except Exception as e:
-                    print(f"Could not remove locked file: {e}")
+                    self.sink.error(f"Could not remove locked file: {e}")
                     raise
 
                 with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as temp_input_retry:
                     temp_input_retry.write(file_content)
                     temp_input_path = temp_input_retry.name
 
-            df = try_process(temp_input_path)
+            df = try_process()
 
             if preview_only:
                 return df
@@ -235,339 +368,47 @@ class BPIAutoCuringProcessor(BaseProcessor):
             payments_path = os.path.join(dirs["BPI_FOR_PAYMENTS"], payments_filename)
             
             try:
-                source_wb = openpyxl.load_workbook(input_file)
+                cured = self.scan_cured_list(input_file)
             except FileNotFoundError:
-                print(f"Error: The file '{input_file}' was not found.")
+                self.sink.error(f"Error: The file '{input_file}' was not found.")
                 return
             
-            dest_wb = openpyxl.Workbook()
-            dest_ws = dest_wb.active
-            
-            headers = ["LAN", "Action Status", "Remark Date", "PTP Date", "Reason For Default", 
-                    "Field Visit Date", "Remark", "Next Call Date", "PTP Amount", "Claim Paid Amount", 
-                    "Remark By", "Phone No.", "Relation", "Claim Paid Date"]
-            
-            for col, header in enumerate(headers, 1):
-                dest_ws.cell(row=1, column=col).value = header
-            
-            ws = source_wb.active
-            if ws.max_column < 43:
-                raise ValueError("File doesn't have the expected number of columns")
-            
-            current_row = 2
-            total_rows = 0
-            last_row = ws.max_row
-            
-            barcode_lookup = {}
-            for row in range(2, last_row + 1):
-                barcode = ws.cell(row=row, column=1).value
-                phone1 = ws.cell(row=row, column=42).value
-                phone2 = ws.cell(row=row, column=43).value
-                phone1 = str(phone1).strip() if phone1 else ""
-                phone2 = str(phone2).strip() if phone2 else ""
-                if phone1:
-                    phone1 = self.process_mobile_number(phone1)
-                if phone2:
-                    phone2 = self.process_mobile_number(phone2)
-                if barcode:
-                    barcode_lookup[barcode] = {
-                        'date': ws.cell(row=row, column=3).value,
-                        'amount': ws.cell(row=row, column=4).value,
-                        'collector': ws.cell(row=row, column=2).value,
-                        'phone1': phone1,
-                        'phone2': phone2,
-                    }
-            
-            nego_rows = []
-            for row in range(2, last_row + 1):
-                if (ws.cell(row=row, column=2).value != "SPMADRID" and 
-                    (ws.cell(row=row, column=8).value is None or "PTP" not in str(ws.cell(row=row, column=8).value))):
-                    nego_rows.append(row)
-            
-            if nego_rows:
-                visible_count = len(nego_rows)
-                
-                for i, row_idx in enumerate(nego_rows):
-                    barcode = ws.cell(row=row_idx, column=1).value
-                    dest_ws.cell(row=current_row + i, column=1).value = barcode
-                    dest_ws.cell(row=current_row + i, column=2).value = "PTP NEW - CALL OUTS_PASTDUE"
-                
-                current_row += visible_count
-                for i, row_idx in enumerate(nego_rows):
-                    barcode = ws.cell(row=row_idx, column=1).value
-                    dest_ws.cell(row=current_row + i, column=1).value = barcode
-                    dest_ws.cell(row=current_row + i, column=2).value = "PTP FF UP - CLIENT ANSWERED AND WILL SETTLE"
-                
-                current_row += visible_count
-                
-                for i, row_idx in enumerate(nego_rows):
-                    barcode = ws.cell(row=row_idx, column=1).value
-                    dest_ws.cell(row=current_row + i, column=1).value = barcode
-                    dest_ws.cell(row=current_row + i, column=2).value = "PAYMENT - CURED"
-                
-                current_row += visible_count
-                
-                total_rows += (visible_count * 3)
-            
-            ptp_rows = []
-            for row in range(2, last_row + 1):
-                if (ws.cell(row=row, column=2).value != "SPMADRID" and 
-                    ws.cell(row=row, column=8).value is not None and 
-                    "PTP" in str(ws.cell(row=row, column=8).value)):
-                    ptp_rows.append(row)
-            
-            if ptp_rows:
-                visible_count = len(ptp_rows)
-                
-                for i, row_idx in enumerate(ptp_rows):
-                    barcode = ws.cell(row=row_idx, column=1).value
-                    dest_ws.cell(row=current_row + i, column=1).value = barcode
-                    dest_ws.cell(row=current_row + i, column=2).value = "PTP FF UP - CLIENT ANSWERED AND WILL SETTLE"
-                
-                current_row += visible_count
-                
-                for i, row_idx in enumerate(ptp_rows):
-                    barcode = ws.cell(row=row_idx, column=1).value
-                    dest_ws.cell(row=current_row + i, column=1).value = barcode
-                    dest_ws.cell(row=current_row + i, column=2).value = "PAYMENT - CURED"
-                
-                current_row += visible_count
-                
-                total_rows += (visible_count * 2)
-            
-            spmadrid_rows = []
-            for row in range(2, last_row + 1):
-                if ws.cell(row=row, column=2).value == "SPMADRID":
-                    spmadrid_rows.append(row)
-            
-            if spmadrid_rows:
-                visible_count = len(spmadrid_rows)
-                
-                for i, row_idx in enumerate(spmadrid_rows):
-                    barcode = ws.cell(row=row_idx, column=1).value
-                    dest_ws.cell(row=current_row + i, column=1).value = barcode
-                    dest_ws.cell(row=current_row + i, column=2).value = "PTP NEW - CURED_GHOST"
-                
-                current_row += visible_count
-                
-                for i, row_idx in enumerate(spmadrid_rows):
-                    barcode = ws.cell(row=row_idx, column=1).value
-                    dest_ws.cell(row=current_row + i, column=1).value = barcode
-                    dest_ws.cell(row=current_row + i, column=2).value = "PAYMENT - CURED"
-                
-                current_row += visible_count
-                
-                total_rows += (visible_count * 2)
-            
-            final_row_count = total_rows + 1
-            
-            for row in range(2, final_row_count + 1):
-                barcode = dest_ws.cell(row=row, column=1).value
-                action_status = dest_ws.cell(row=row, column=2).value
-                
-                source_data = barcode_lookup.get(barcode, {})
-                source_date = source_data.get('date')
-                source_amount = source_data.get('amount')
-                source_collector = source_data.get('collector')
-                source_phone1 = source_data.get('phone1')
-                source_phone2 = source_data.get('phone2')
-                
-                if source_date:
-                    try:
-                        if hasattr(source_date, 'strftime'): 
-                            base_date = source_date
-                        else:
-                            try:
-                                base_date = datetime.strptime(str(source_date), "%Y-%m-%d %H:%M:%S")
-                            except:
-                                try:
-                                    base_date = datetime.strptime(str(source_date), "%Y-%m-%d")
-                                except:
-                                    base_date = datetime.now()
-                    except:
-                        base_date = datetime.now()
-                    
-                    if "PTP NEW" in action_status:
-                        time_to_add = time(14, 40, 0)
-                    elif "PTP FF" in action_status:
-                        time_to_add = time(14, 50, 0)
-                    elif "CURED" in action_status:
-                        time_to_add = time(15, 0, 0)
-                    else:
-                        time_to_add = time(0, 0, 0)
-                    
-                    if not hasattr(base_date, 'time'):
-                        base_date = datetime.combine(base_date, time(0, 0, 0))
-                    
-                    result_date = datetime.combine(base_date.date(), time_to_add)
-                    
-                    formatted_date = result_date.strftime("%m/%d/%Y %I:%M:%S %p")
-                    dest_ws.cell(row=row, column=3).value = formatted_date
-                    
-                    formatted_date = result_date.strftime("%m/%d/%Y")
-                    dest_ws.cell(row=row, column=4).value = formatted_date
-                    
-                    dest_ws.cell(row=row, column=3).number_format = '@'
-                    dest_ws.cell(row=row, column=4).number_format = '@'
-                else:
-                    dest_ws.cell(row=row, column=3).value = ""
-                    dest_ws.cell(row=row, column=4).value = ""
-                
-                phone_no = ""
-                if "PAYMENT" not in action_status:
-                    raw_value = dest_ws.cell(row=row, column=12).value
-                    if raw_value:
-                        phone_no = str(raw_value).strip().split('.')[0]
-                
-                if "PTP NEW" in action_status:
-                    phone_value = source_phone1 if source_phone1 else source_phone2
-                    remark_text = f"1_{phone_value} - PTP NEW"
-                elif "PTP FF" in action_status:
-                    phone_value = source_phone1 if source_phone1 else source_phone2
-                    remark_text = f"{phone_value} - FPTP"
-                elif "PAYMENT" in action_status:
-                    remark_text = "CURED - CONFIRM VIA SELECTIVE LIST"
-                else:
-                    remark_text = ""
-                
-                dest_ws.cell(row=row, column=7).value = remark_text
-                
-                if "PAYMENT" in action_status:
-                    dest_ws.cell(row=row, column=9).value = ""
-                else:
-                    dest_ws.cell(row=row, column=9).value = source_amount
-                
-                if "PAYMENT" in action_status:
-                    dest_ws.cell(row=row, column=10).value = source_amount
-                else:
-                    dest_ws.cell(row=row, column=10).value = ""
-                
-                dest_ws.cell(row=row, column=11).value = source_collector
-                
-                if "PAYMENT" in action_status:
-                    dest_ws.cell(row=row, column=12).value = ""
-                else:
-                    if source_phone1 and source_phone1 != "":
-                        dest_ws.cell(row=row, column=12).value = source_phone1
-                    else:
-                        dest_ws.cell(row=row, column=12).value = source_phone2
-                
-                if "PAYMENT" in action_status and source_date:
-                    if isinstance(source_date, datetime):
-                        formatted_paid_date = source_date.strftime("%m/%d/%Y")
-                    elif isinstance(source_date, date):
-                        formatted_paid_date = source_date.strftime("%m/%d/%Y")
-                    else:
-                        try:
-                            date_obj = datetime.strptime(str(source_date), "%Y-%m-%d %H:%M:%S")
-                            formatted_paid_date = date_obj.strftime("%m/%d/%Y")
-                        except:
-                            try:
-                                date_obj = datetime.strptime(str(source_date), "%Y-%m-%d")
-                                formatted_paid_date = date_obj.strftime("%m/%d/%Y")
-                            except:
-                                formatted_paid_date = ""
-                    dest_ws.cell(row=row, column=14).value = formatted_paid_date
-                else:
-                    dest_ws.cell(row=row, column=14).value = ""
-            
-            for row in range(2, final_row_count + 1):
-                action_status = dest_ws.cell(row=row, column=2).value
-                phone_no = dest_ws.cell(row=row, column=12).value
-                
-                if "PTP NEW" in action_status and phone_no:
-                    dest_ws.cell(row=row, column=7).value = f"1_{phone_no} - PTP NEW"
-                elif "PTP FF" in action_status and phone_no:
-                    dest_ws.cell(row=row, column=7).value = f"{phone_no} - FPTP"
-            
-            for column in dest_ws.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-                for cell in column:
-                    try:
-                        if cell.value and len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = (max_length + 2)
-                dest_ws.column_dimensions[column_letter].width = adjusted_width
-
-            for row_idx in range(2, dest_ws.max_row + 1):  
-                for col_idx in [3, 4, 14]: 
-                    cell = dest_ws.cell(row=row_idx, column=col_idx)
-                    if cell.value:
-                        cell_value_str = str(cell.value)
-                        cell.value = cell_value_str
-                        cell.number_format = '@'
-
-            dest_wb.save(remarks_path)
-            
-            others_wb = openpyxl.Workbook()
-            others_ws = others_wb.active
-            
-            others_ws.cell(row=1, column=1).value = ws.cell(row=1, column=1).value 
-            others_ws.cell(row=1, column=2).value = "REMARK BY" 
-            
-            for row in range(2, last_row + 1):
-                others_ws.cell(row=row, column=1).value = ws.cell(row=row, column=1).value
-
-                reference_value = ws.cell(row=row, column=1).value 
-                
-                for cured_row in range(2, ws.max_row + 1):  
-                    if ws.cell(row=cured_row, column=1).value == reference_value: 
-                        others_ws.cell(row=row, column=2).value = ws.cell(row=cured_row, column=2).value 
-                        break
-
-            others_wb.save(others_path)
-            
-            payments_wb = openpyxl.Workbook()
-            payments_ws = payments_wb.active
-            payments_ws.cell(row=1, column=1).value = "LAN"
-            payments_ws.cell(row=1, column=2).value = "ACCOUNT NUMBER"
-            payments_ws.cell(row=1, column=3).value = "NAME"
-            payments_ws.cell(row=1, column=4).value = "CARD NUMBER"
-            payments_ws.cell(row=1, column=5).value = "PAYMENT AMOUNT"
-            payments_ws.cell(row=1, column=6).value = "PAYMENT DATE"
-            
-            for row in range(2, last_row + 1):
-                payments_ws.cell(row=row, column=1).value = ws.cell(row=row, column=17).value if ws.cell(row=row, column=17).value else ""
-                payments_ws.cell(row=row, column=3).value = ws.cell(row=row, column=18).value if ws.cell(row=row, column=18).value else ""
-                payments_ws.cell(row=row, column=5).value = ws.cell(row=row, column=4).value if ws.cell(row=row, column=4).value else ""
-                date_value = ws.cell(row=row, column=3).value
-                if date_value:
-                    if isinstance(date_value, datetime):
-                        formatted_date = date_value.strftime("%m/%d/%Y")
-                    else:
-                        formatted_date = str(date_value)
-                    payments_ws.cell(row=row, column=6).value = formatted_date
-            
-            for row in range(2, last_row + 1):
-                payments_ws.cell(row=row, column=6).number_format = "@"
-            
-            for column in payments_ws.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-                for cell in column:
-                    try:
-                        if cell.value and len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = (max_length + 2)
-                payments_ws.column_dimensions[column_letter].width = adjusted_width
-            
-            payments_wb.save(payments_path)
-            
-            remarks_df = pd.read_excel(remarks_path)
-            others_df = pd.read_excel(others_path)
-            payments_df = pd.read_excel(payments_path)
-            
-            with open(remarks_path, 'rb') as f:
-                remarks_binary = f.read()
-            with open(others_path, 'rb') as f:
-                others_binary = f.read()
-            with open(payments_path, 'rb') as f:
-                payments_binary = f.read()
+            remarks_df = self.build_cured_remarks(cured)
+            
+            remarks_binary = self.export_excel(
+                remarks_df, sheet_name='Sheet', text_columns=CURED_REMARKS_TEXT_COLUMNS, autofit=True
+            )
+            
+            others_df = pd.DataFrame({
+                cured['header'][0]: cured['barcodes'],
+                "REMARK BY": [cured['barcode_index'][barcode]['remark_by'] for barcode in cured['barcodes']],
+            })
+            others_binary = self.export_excel(others_df, sheet_name='Sheet')
+            
+            payments = cured['payments']
+            payments_df = pd.DataFrame({
+                "LAN": [lan if lan else "" for lan, _, _, _ in payments],
+                "ACCOUNT NUMBER": [None] * len(payments),
+                "NAME": [name if name else "" for _, name, _, _ in payments],
+                "CARD NUMBER": [None] * len(payments),
+                "PAYMENT AMOUNT": [amount if amount else "" for _, _, amount, _ in payments],
+                "PAYMENT DATE": [
+                    (date_value.strftime("%m/%d/%Y") if isinstance(date_value, datetime) else str(date_value))
+                    if date_value else None
+                    for _, _, _, date_value in payments
+                ],
+            })
+            payments_binary = self.export_excel(
+                payments_df, sheet_name='Sheet', text_columns=["PAYMENT DATE"], autofit=True
+            )
+            
+            for path, binary in ((remarks_path, remarks_binary), (others_path, others_binary), (payments_path, payments_binary)):
+                with open(path, 'wb') as f:
+                    f.write(binary)
+            
+            remarks_df = as_exported(remarks_df)
+            others_df = as_exported(others_df)
+            payments_df = as_exported(payments_df)
                 
             os.unlink(temp_input_path)
             
@@ -587,5 +428,5 @@ class BPIAutoCuringProcessor(BaseProcessor):
                 try:
                     os.remove(temp_input_path)
                 except Exception as e:
-                    print(f"Failed to delete temp file: {e}")
+                    self.sink.warning(f"Failed to delete temp file: {e}")
  
\ No newline at end of file
@@ -0,0 +1,89 @@
+import logging
+import threading
+
+ERROR = 'error'
+WARNING = 'warning'
+INFO = 'info'
+TABLE = 'table'
+
+class ReportEvent:
+    """
+    One message a processor wants shown to whoever runs it.
+
+    level is ERROR, WARNING, INFO or TABLE; values are extra objects shown after
+    an INFO message (e.g. a list of columns) and data is the DataFrame of a TABLE.
+    """
+    __slots__ = ('level', 'message', 'values', 'data')
+
+    def __init__(self, level, message, values=(), data=None):
+        self.level = level
+        self.message = message
+        self.values = tuple(values)
+        self.data = data
+
+    def __repr__(self):
+        return f"ReportEvent({self.level!r}, {self.message!r})"
+
+class ReportSink:
+    """
+    Where processors send their errors, warnings and progress notes.
+    Subclasses implement emit(); the helpers build the event.
+    """
+    def emit(self, event):
+        raise NotImplementedError
+
+    def error(self, message):
+        self.emit(ReportEvent(ERROR, message))
+
+    def warning(self, message):
+        self.emit(ReportEvent(WARNING, message))
+
+    def info(self, message, *values):
+        self.emit(ReportEvent(INFO, message, values))
+
+    def table(self, data, message=''):
+        self.emit(ReportEvent(TABLE, message, data=data))
+
+class StreamlitSink(ReportSink):
+    """Render events in the running Streamlit app, as the processors always did."""
+    def emit(self, event):
+        import streamlit as st
+
+        if event.level == ERROR:
+            st.error(event.message)
+        elif event.level == WARNING:
+            st.warning(event.message)
+        elif event.level == TABLE:
+            if event.message:
+                st.write(event.message)
+            st.dataframe(event.data, use_container_width=True)
+        else:
+            st.write(event.message, *event.values)
+
+class LoggingSink(ReportSink):
+    """Send events to a logger, for batch runs and worker processes without a UI."""
+    LEVELS = {ERROR: logging.ERROR, WARNING: logging.WARNING, INFO: logging.INFO, TABLE: logging.INFO}
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger('processor')
+
+    def emit(self, event):
+        message = event.message
+        if event.values:
+            message = ' '.join([message] + [str(value) for value in event.values])
+        if event.level == TABLE and event.data is not None:
+            message = f"{message} ({len(event.data)} rows)"
+        self.logger.log(self.LEVELS.get(event.level, logging.INFO), message)
+
+class CollectingSink(ReportSink):
+    """Keep events in memory so callers (and tests) can inspect them afterwards."""
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def emit(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def messages(self, level=None):
+        return [event.message for event in self.events if level is None or event.level == level]
@@ -1,32 +1,39 @@
-import streamlit as st
 import pandas as pd
 import os
 import numpy as np
-from openpyxl.utils import get_column_letter, column_index_from_string
+from openpyxl.utils import column_index_from_string
 from openpyxl.styles import Border, Side, Alignment
 from openpyxl.styles import numbers
-from openpyxl import load_workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.styles import Border, Side
 from datetime import datetime
 import io
 import pytz
-from processor.base import BaseProcessor as base
+from processor.base import BaseProcessor as base, SUPABASE_PAGE_SIZE
+from processor.xlsx_patch import XlsxPatcher, THIN_BORDER_XML
+
+def lookup_accounts(account_numbers, account_info):
+    """
+    Left-join account_info (indexed by account number) onto a Series of account
+    numbers. Accounts that are not in account_info come back as ''.
+    """
+    matched = account_numbers.to_frame('_account').join(account_info, on='_account').drop(columns='_account')
+    found = account_numbers.isin(account_info.index)
+    return pd.DataFrame({col: matched[col].where(found, '') for col in matched.columns}, index=matched.index)
 
 class ROBBikeProcessor(base):
+    phone_rules = 'rob_bike'
+
     def process_daily_remark(self, file_content, sheet_name=None, preview_only=False,
                     remove_duplicates=False, remove_blanks=False, trim_spaces=False, report_date=None):
         try:
-            byte_stream = io.BytesIO(file_content)
-            xls = pd.ExcelFile(byte_stream)
-            df = pd.read_excel(xls, sheet_name=sheet_name)
+            df = self.read_sheet(file_content, sheet_name=sheet_name)
             df = self.clean_data(df, remove_duplicates, remove_blanks, trim_spaces)
             
             required_columns = ['Time', 'Status', 'Account No.', 'Debtor', 'DPD', 'Remark', 'Remark By', 'PTP Amount', 'Balance', 'Claim Paid Amount']
             
             missing_columns = [col for col in required_columns if col not in df.columns]
             if missing_columns:
-                st.error("Required columns not found in the uploaded file.")
+                self.sink.error("Required columns not found in the uploaded file.")
                 return None, None, None
             else: 
                 if 'Time' in df.columns:
@@ -48,12 +55,8 @@ class ROBBikeProcessor(base):
                 
                     df = df[~(dnc_mask | blank_mask)]
                     
-                    disposition = self.supabase.table('rob_bike_disposition').select("disposition").execute()
-                
-                    if disposition.data is None:
-                        valid_dispo = []
-                    else:
-                        valid_dispo = [record['disposition'] for record in disposition.data]
+                    disposition = self.batch_client.fetch_table('rob_bike_disposition', select="disposition", order=('disposition',))
+                    valid_dispo = [record['disposition'] for record in disposition]
                 
                     not_in_valid_dispo = ~df['Status'].isin(valid_dispo)
                     removed_invalid_dispo_count = not_in_valid_dispo.sum()
@@ -93,10 +96,10 @@ class ROBBikeProcessor(base):
                     ]
 
                     if not invalid_amount_rows.empty:
-                        st.warning(f"Found {len(invalid_amount_rows)} row(s) with 'PTP - VOLUNTARY SURRENDER' but 0 or missing 'PTP Amount'.")
-                        st.dataframe(invalid_amount_rows, use_container_width=True)
+                        self.sink.warning(f"Found {len(invalid_amount_rows)} row(s) with 'PTP - VOLUNTARY SURRENDER' but 0 or missing 'PTP Amount'.")
+                        self.sink.table(invalid_amount_rows)
                         
-                st.write(f"Removed: {removed_dnc_count} DNC, {removed_blank_count} blank status, {removed_invalid_dispo_count} invalid disposition, {system_auto_update_remarks_count} system auto update remarks, {system_remarks_count} system remarks, {initial_duplicates} duplicates.")
+                self.sink.info(f"Removed: {removed_dnc_count} DNC, {removed_blank_count} blank status, {removed_invalid_dispo_count} invalid disposition, {system_auto_update_remarks_count} system auto update remarks, {system_remarks_count} system remarks, {initial_duplicates} duplicates.")
 
                 if preview_only:
                     return df, None, None
@@ -168,97 +171,67 @@ class ROBBikeProcessor(base):
                         )
                     )
                                     
+                account_info = None
                 if 'Account No.' in df.columns:
                     account_numbers = [str(int(acc)) for acc in df['Account No.'].dropna().unique().tolist()]
-                    dataset_response = self.supabase.table('rob_bike_dataset').select('*').in_('account_number', account_numbers).execute()
+                    dataset_records = self.batch_client.fetch_in(
+                        'rob_bike_dataset', 'account_number', account_numbers,
+                        select='account_number, chcode, endo_date, stores, cluster',
+                        page_size=SUPABASE_PAGE_SIZE, order=('account_number', 'chcode')
+                    )
                     
-                    if hasattr(dataset_response, 'data') and dataset_response.data:
-                        dataset_df = pd.DataFrame(dataset_response.data)
+                    if dataset_records:
+                        dataset_df = pd.DataFrame(dataset_records)
                         monitoring_df['Account Number'] = monitoring_df['Account Number'].apply(lambda x: str(int(float(x))) if pd.notnull(x) else '')
                         
-                        account_data_map = {}
-                        chcode_list = []
+                        account_no = dataset_df['account_number'].astype(str).str.strip()
+                        account_info = pd.DataFrame({
+                            'ChCode': dataset_df['chcode'],
+                            'AccountNumber': "00" + account_no,
+                            'EndoDate': dataset_df['endo_date'],
+                            'Stores': dataset_df['stores'],
+                            'Cluster': dataset_df['cluster'],
+                        }).set_axis(account_no)
+                        account_info = account_info[~account_info.index.duplicated(keep='last')]
                         
-                        for _, row in dataset_df.iterrows():
-                            account_no = str(row['account_number']).strip()
-                            chcode = row.get('chcode', '')
-                            
-                            if chcode:
-                                chcode_list.append(chcode)
-                                
-                            account_data_map[account_no] = {
-                                'ChCode': chcode,
-                                'AccountNumber': "00" + account_no,
-                                'EndoDate': row.get('endo_date', ''),
-                                'Stores': row.get('stores', ''),
-                                'Cluster': row.get('cluster', '')
-                            }
+                        latest_status = pd.DataFrame(columns=['Field_Status', 'Field_Substatus'])
+                        chcode_list = account_info['ChCode'].dropna().tolist()
                         
                         if chcode_list:
                             try:
-                                field_results_response = self.supabase.table('rob_bike_field_result').select('*').in_('chcode', chcode_list).execute()
+                                field_results = self.batch_client.fetch_in(
+                                    'rob_bike_field_result', 'chcode', chcode_list,
+                                    select='chcode, status, substatus, inserted_date',
+                                    page_size=SUPABASE_PAGE_SIZE, order=('chcode', 'inserted_date', 'status', 'substatus')
+                                )
                                 
-                                if hasattr(field_results_response, 'data') and field_results_response.data:
-                                    field_results_df = pd.DataFrame(field_results_response.data)
-                                    
-                                    if 'inserted_date' in field_results_df.columns:
-                                        field_results_df['inserted_date'] = pd.to_datetime(field_results_df['inserted_date'])
-                                    
-                                    latest_status_map = {}
+                                if field_results:
+                                    field_results_df = pd.DataFrame(field_results)
+                                    field_results_df['inserted_date'] = pd.to_datetime(field_results_df['inserted_date'])
+                                    field_results_df = field_results_df.dropna(subset=['inserted_date'])
                                     
-                                    if 'inserted_date' in field_results_df.columns:
-                                        for chcode, group in field_results_df.groupby('chcode'):
-                                            latest_row = group.sort_values('inserted_date', ascending=False).iloc[0]
-                                            
-                                            status = latest_row.get('status', '')
-                                            substatus = latest_row.get('substatus', '')
-                                            
-                                            if status in ('0', '') or substatus in ('0', ''):
-                                                status, substatus = '', ''
-                                            
-                                            latest_status_map[chcode] = {
-                                                'Field_Status': status if status not in ('0', '') else '',
-                                                'Field_Substatus': substatus if substatus not in ('0', '') else '',
-                                            }
-                                        
-                                        for account_no, data in account_data_map.items():
-                                            chcode = data['ChCode']
-                                            if chcode in latest_status_map:
-                                                account_data_map[account_no].update({
-                                                    'Field_Status': latest_status_map[chcode]['Field_Status'],
-                                                    'Field_Substatus': latest_status_map[chcode]['Field_Substatus'],
-                                                })
-                                            else:
-                                                account_data_map[account_no].update({
-                                                    'Field_Status': '',
-                                                    'Field_Substatus': '',
-                                                })
+                                    latest = field_results_df.loc[field_results_df.groupby('chcode')['inserted_date'].idxmax()]
+                                    blank = latest['status'].isin(['0', '']) | latest['substatus'].isin(['0', ''])
+                                    latest_status = pd.DataFrame({
+                                        'Field_Status': latest['status'].mask(blank, ''),
+                                        'Field_Substatus': latest['substatus'].mask(blank, ''),
+                                    }).set_axis(latest['chcode'])
                                             
                             except Exception as e:
-                                st.error(f"Error fetching field results: {str(e)}")
-                        
-                        monitoring_df['EndoDate'] = monitoring_df['Account Number'].map(
-                            lambda acc_no: account_data_map.get(acc_no, {}).get('EndoDate', ''))
-                        monitoring_df['EndoDate'] = pd.to_datetime(monitoring_df['EndoDate']).dt.strftime('%m/%d/%Y')
-                        
-                        monitoring_df['Stores'] = monitoring_df['Account Number'].map(
-                            lambda acc_no: '' if account_data_map.get(acc_no, {}).get('Stores') in ['0', 0] 
-                            else account_data_map.get(acc_no, {}).get('Stores', '')
-                        )
-                        
-                        monitoring_df['Cluster'] = monitoring_df['Account Number'].map(
-                            lambda acc_no: '' if account_data_map.get(acc_no, {}).get('Cluster') in ['0', 0] 
-                            else account_data_map.get(acc_no, {}).get('Cluster', '')
-                        )
+                                self.sink.error(f"Error fetching field results: {str(e)}")
                         
-                        monitoring_df['Field Status'] = monitoring_df['Account Number'].map(
-                            lambda acc_no: account_data_map.get(acc_no, {}).get('Field_Status', ''))
+                        account_info = account_info.join(latest_status, on='ChCode')
+                        has_status = account_info['ChCode'].isin(latest_status.index)
+                        for col in ['Field_Status', 'Field_Substatus']:
+                            account_info[col] = account_info[col].where(has_status, '')
                         
-                        monitoring_df['Field Substatus'] = monitoring_df['Account Number'].map(
-                            lambda acc_no: account_data_map.get(acc_no, {}).get('Field_Substatus', ''))
-                        
-                        monitoring_df['Account Number'] = monitoring_df['Account Number'].map(
-                            lambda acc_no: account_data_map.get(acc_no, {}).get('AccountNumber', ''))
+                        matched = lookup_accounts(monitoring_df['Account Number'], account_info)
+                        monitoring_df['EndoDate'] = pd.to_datetime(matched['EndoDate']).dt.strftime('%m/%d/%Y')
+                        monitoring_df['Stores'] = matched['Stores'].mask(matched['Stores'].isin(['0', 0]), '')
+                        monitoring_df['Cluster'] = matched['Cluster'].mask(matched['Cluster'].isin(['0', 0]), '')
+                        monitoring_df['Field Status'] = matched['Field_Status']
+                        monitoring_df['Field Substatus'] = matched['Field_Substatus']
+                        monitoring_df['Account Number'] = matched['AccountNumber']
                         
                 ptp_data = df[df['Status'].str.contains('PTP', case=False, na=False)].copy() if 'Status' in df.columns else pd.DataFrame()
                 
@@ -294,15 +267,11 @@ class ROBBikeProcessor(base):
                             dt.strftime('%m/%d/%Y %I:%M:%S %p').replace(' 0', ' ') if dt else '' for dt in result_datetime
                         ]
                         
-                    if 'Account No.' in ptp_data.columns and 'account_data_map' in locals():
+                    if 'Account No.' in ptp_data.columns and account_info is not None:
                         ptp_df['AccountNumber'] = ptp_df['AccountNumber'].apply(lambda x: str(int(float(x))) if pd.notnull(x) else '')
-                        ptp_df['EndoDate'] = ptp_df['AccountNumber'].map(
-                            lambda acc_no: account_data_map.get(acc_no, {}).get('EndoDate', ''))
-                        ptp_df['EndoDate'] = pd.to_datetime(ptp_df['EndoDate']).dt.strftime('%m/%d/%Y')
-                
-                    if 'Account No.' in df.columns:
-                        ptp_df['AccountNumber'] = ptp_df['AccountNumber'].map(
-                            lambda acc_no: account_data_map.get(acc_no, {}).get('AccountNumber', ''))
+                        matched = lookup_accounts(ptp_df['AccountNumber'], account_info)
+                        ptp_df['EndoDate'] = pd.to_datetime(matched['EndoDate']).dt.strftime('%m/%d/%Y')
+                        ptp_df['AccountNumber'] = matched['AccountNumber']
             
                 payment_statuses = [
                     "PAYMENT", "PAYMENT VIA CALL", "PAYMENT VIA SMS", "PAYMENT VIA EMAIL",
@@ -400,71 +369,31 @@ class ROBBikeProcessor(base):
                 
                 if os.path.exists(template_path):
                     try:
-                        with open(template_path, 'rb') as template_file:
-                            template_copy = io.BytesIO(template_file.read())
+                        template_data = self.template_bytes(template_path)
                             
                         try:
-                            template_wb = load_workbook(template_copy)
-                            
-                            def append_df_to_sheet(sheet_name, df):
-                                if sheet_name in template_wb.sheetnames:
-                                    sheet = template_wb[sheet_name]
-                                    start_row = sheet.max_row + 1
-                                    for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=False), start_row):
-                                        for c_idx, value in enumerate(row, 1):
-                                            sheet.cell(row=r_idx, column=c_idx).value = value
+                            patcher = XlsxPatcher(template_data)
+                            bordered = patcher.derive_style(0, border_id=patcher.add_border(THIN_BORDER_XML))
                             
-                            append_df_to_sheet(sheet1, monitoring_df)
-                            append_df_to_sheet(sheet2, ptp_df)
-                            
-                            def format_sheet(sheet_name, df=None):
-                                sheet = template_wb[sheet_name]
-                                
-                                thin_border = Border(
-                                    left=Side(style='thin'),
-                                    right=Side(style='thin'),
-                                    top=Side(style='thin'),
-                                    bottom=Side(style='thin'),
-                                )
-
-                                if df is not None:
-                                    for col_idx, col in enumerate(df.columns, 1):
-                                        max_length = max(
-                                            df[col].astype(str).map(len).max(),
-                                            len(str(col))
-                                        )
-                                        adjusted_width = max_length + 2
-                                        sheet.column_dimensions[get_column_letter(col_idx)].width = adjusted_width
-
-                                    start_row = sheet.max_row - len(df) + 1
-                                    for row in sheet.iter_rows(min_row=start_row, max_row=sheet.max_row, min_col=1, max_col=len(df.columns)):
-                                        for cell in row:
-                                            cell.border = thin_border
+                            for sheet_name, df in ((sheet1, monitoring_df), (sheet2, ptp_df)):
+                                if sheet_name in patcher.sheet_names:
+                                    sheet = patcher.sheet(sheet_name)
+                                    sheet.append_rows(df.itertuples(index=False, name=None), style=bordered)
+                                    sheet.set_column_widths(self.column_widths(df))
                                             
-                            if sheet5 in template_wb.sheetnames:
-                                eod_sheet = template_wb[sheet5]
-                                for _, row in eod_df.iterrows():
-                                    cell_key = row['Key']
-                                    value = row['Value']
-                                    column_letter = cell_key[0]
-                                    row_number = int(cell_key[1:])
-                                    column_index = column_index_from_string(column_letter)
-                                    eod_sheet.cell(row=row_number, column=column_index).value = value
-                            
-                            format_sheet(sheet1, monitoring_df)
-                            format_sheet(sheet2, ptp_df)
-                            format_sheet(sheet5, None)
+                            if sheet5 in patcher.sheet_names:
+                                patcher.sheet(sheet5).set_values(dict(zip(eod_df['Key'], eod_df['Value'])))
                             
-                            template_wb.save(output_buffer)
+                            output_buffer.write(patcher.save())
                             
                         except Exception as e:
-                            st.error(f"Error processing template: {str(e)}")
+                            self.sink.error(f"Error processing template: {str(e)}")
                             
                     except Exception as e:
-                        st.error(f"Error reading template file: {str(e)}")
+                        self.sink.error(f"Error reading template file: {str(e)}")
                     
                 else:
-                    st.write("Template does not exist")
+                    self.sink.info("Template does not exist")
                     with pd.ExcelWriter(output_buffer, engine='openpyxl') as writer:
                         monitoring_df.to_excel(writer, sheet_name=sheet1, index=False)
                         ptp_df.to_excel(writer, sheet_name=sheet2, index=False)
@@ -486,13 +415,7 @@ class ROBBikeProcessor(base):
                             )
                             
                             if df is not None: 
-                                for col_idx, col in enumerate(df.columns, 1):
-                                    max_length = max(
-                                        df[col].astype(str).map(len).max(),
-                                        len(str(col))
-                                    )
-                                    adjusted_width = max_length + 2
-                                    sheet.column_dimensions[get_column_letter(col_idx)].width = adjusted_width
+                                self.autofit_columns(sheet, df)
                                 
                                 for row in sheet.iter_rows(min_row=1, max_row=len(df)+1, min_col=1, max_col=len(df.columns)):
                                     for cell in row:
@@ -525,19 +448,14 @@ class ROBBikeProcessor(base):
                 return monitoring_df, output_buffer.getvalue(), output_filename
         
         except Exception as e:
-            st.error(f"Error processing daily remark: {str(e)}")
+            self.sink.error(f"Error processing daily remark: {str(e)}")
             return None, None, None
 
     def process_new_endorsement(self, file_content, sheet_name=None, preview_only=False,
                          remove_duplicates=False, remove_blanks=False, trim_spaces=False, preserve_colors=True):
         try:
-            if isinstance(file_content, bytes):
-                file_content = io.BytesIO(file_content)
-            
-            xls = pd.ExcelFile(file_content)
-            
-            df = pd.read_excel(
-                xls, 
+            df = self.read_sheet(
+                file_content, 
                 sheet_name=sheet_name,
                 dtype={'Account Number': str}
             )
@@ -556,7 +474,7 @@ class ROBBikeProcessor(base):
 
             missing_cols = [col for col in required_columns if col not in df.columns]
             if missing_cols:
-                st.error("Required columns not found in the uploaded file.")
+                self.sink.error("Required columns not found in the uploaded file.")
                 return None, None, None
             else:
                 if 'Endorsement Date' in df.columns:
@@ -569,24 +487,20 @@ class ROBBikeProcessor(base):
                     df['Account Number'] = df['Account Number'].astype(str).str.strip()
                     account_numbers_list = [str(int(acc)) for acc in df['Account Number'].dropna().unique().tolist()]
                     
-                    batch_size = 100 
-                    existing_accounts = []
-                    for i in range(0, len(account_numbers_list), batch_size):
-                        batch = account_numbers_list[i:i + batch_size]
-                        response = self.supabase.table('rob_bike_dataset').select('*').in_('account_number', batch).execute()
-
-                        if hasattr(response, 'data') and response.data:
-                            existing_accounts.extend([str(item['account_number']) for item in response.data])
+                    existing_records = self.batch_client.fetch_in(
+                        'rob_bike_dataset', 'account_number', account_numbers_list, select='account_number'
+                    )
+                    existing_accounts = [str(item['account_number']) for item in existing_records]
 
                     initial_rows = len(df)
                     df = df[~df['Account Number'].astype(str).isin(existing_accounts)]
                     removed_rows = initial_rows - len(df)
                     
                     if removed_rows > 0:
-                        st.write(f"Removed {removed_rows} rows with existing account numbers")
+                        self.sink.info(f"Removed {removed_rows} rows with existing account numbers")
                     
                     if df.empty: 
-                        st.warning("No new account numbers found (all account numbers exists)")
+                        self.sink.warning("No new account numbers found (all account numbers exists)")
                         return None, None, None
                 
                 manila_timezone = pytz.timezone('Asia/Manila')
@@ -598,7 +512,7 @@ class ROBBikeProcessor(base):
                     df['Endrosement OB'] = pd.to_numeric(df['Endrosement OB'], errors='coerce')
                     zero_ob_rows = df[df['Endrosement OB'] == 0]
                     if not zero_ob_rows.empty:
-                        st.warning(f"Found {len(zero_ob_rows)} rows with 0 in Endorsement OB")
+                        self.sink.warning(f"Found {len(zero_ob_rows)} rows with 0 in Endorsement OB")
                 
                 if preview_only:
                     return df, None, None
@@ -608,7 +522,7 @@ class ROBBikeProcessor(base):
                 
                 cms_endo_df = df.copy()
                 if 'Contact No.' in cms_endo_df.columns:
-                    cms_endo_df['Contact No.'] = cms_endo_df['Contact No.'].apply(self.clean_phone_number)
+                    cms_endo_df['Contact No.'] = self.normalize_phones(cms_endo_df['Contact No.'])
 
                 if 'BRAND' in cms_endo_df.columns and 'MODEL' in cms_endo_df.columns:
                     cms_endo_df['DESCRIP'] = cms_endo_df.apply(
@@ -638,7 +552,7 @@ class ROBBikeProcessor(base):
                 }
             
         except Exception as e:
-            st.error(f"Error processing new endorsement: {str(e)}")
+            self.sink.error(f"Error processing new endorsement: {str(e)}")
             return None, None, None
         
     def clean_phone_number(self, phone):
@@ -676,82 +590,11 @@ class ROBBikeProcessor(base):
         return digits
         
     def create_excel_file(self, df):
-        output = io.BytesIO()
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Sheet1')
-
-            workbook = writer.book
-            worksheet = writer.sheets['Sheet1']
-            final_columns = df.columns
-            
-            thin_border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-
-            account_col_idx = None
-            maturity_col_idx = None
-            endo_date_col_idx = None
-            
-            for i, col in enumerate(final_columns):
-                col_letter = get_column_letter(i + 1)
-                
-                if col == 'Account Number':
-                    account_col_idx = i + 1
-                elif col == 'Maturity date':
-                    maturity_col_idx = i + 1
-                elif col == 'ENDO DATE':
-                    endo_date_col_idx = i + 1
-                
-                if col in ['Account Number', 'ACCT NAME', 'Endrosement DPD', 'ENDO DATE', 'Endrosement OB', 
-                          'MONTHLY AMORT', 'Maturity date', 'Contact No.', 'DESCRIP']:
-                    max_length = max(
-                        [len(str(cell.value)) if cell.value is not None else 0
-                        for cell in worksheet[col_letter]]
-                    )
-                    adjusted_width = max_length + 2
-                    worksheet.column_dimensions[col_letter].width = adjusted_width
-                
-                if col == 'Contact No.':
-                    for row in range(2, len(df) + 2):
-                        cell = worksheet.cell(row=row, column=i+1)
-                        cell.number_format = '@' 
-                        if cell.value is not None:
-                            cell.value = str(cell.value)
-
-            for row in range(2, len(df) + 2):  
-                if account_col_idx:
-                    cell = worksheet.cell(row=row, column=account_col_idx)
-                    cell.number_format = '@' 
-                    if cell.value is not None:
-                        cell.value = str(cell.value)
-                        
-                if maturity_col_idx:
-                    cell = worksheet.cell(row=row, column=maturity_col_idx)
-                    if cell.value is not None:
-                        try:
-                            date_value = pd.to_datetime(cell.value).strftime("%m/%d/%Y")
-                            cell.value = date_value
-                        except:
-                            pass
-
-                if endo_date_col_idx:
-                    cell = worksheet.cell(row=row, column=endo_date_col_idx)
-                    if cell.value is not None:
-                        try:
-                            date_value = pd.to_datetime(cell.value).strftime("%m/%d/%Y")
-                            cell.value = date_value
-                            cell.number_format = '@'
-                        except:
-                            pass
-
-                for col_idx in range(1, len(final_columns) + 1):
-                        cell = worksheet.cell(row=row, column=col_idx)
-                        cell.border = thin_border
-
-        output.seek(0)
-        return output.getvalue()
-        
\ No newline at end of file
+        return self.export_excel(
+            df,
+            text_columns=['Account Number', 'Contact No.', 'ENDO DATE'],
+            date_columns={'Maturity date': "%m/%d/%Y", 'ENDO DATE': "%m/%d/%Y"},
+            border=True,
+            autofit=['Account Number', 'ACCT NAME', 'Endrosement DPD', 'ENDO DATE', 'Endrosement OB', 
+                     'MONTHLY AMORT', 'Maturity date', 'Contact No.', 'DESCRIP'],
+        )
@@ -1,9 +1,26 @@
-import streamlit as st
 import pandas as pd
-import os
-import io
-from openpyxl import load_workbook
 from processor.base import BaseProcessor
+from processor.xlsx_patch import XlsxPatcher
+
+def build_account_remarks(df):
+    """
+    Series of "<date> <remark>" values indexed by account number, where the account
+    number is normalized the same way as the daily remark file ("1234.0" -> "1234").
+    """
+    accounts = pd.to_numeric(df['Account No.']).astype('int64').astype(str).str.strip()
+    remark = df['Remark'].astype(object).where(df['Remark'].notna(), '').astype(str)
+    remarks = ((df['FormattedDate'] + ' ').fillna('') + remark).set_axis(accounts)
+    return remarks[~remarks.index.duplicated(keep='last')]
+
+def map_account_remarks(accounts, account_remarks):
+    """
+    Look up the remark for each template account value. Only matched accounts are
+    returned, under their index in accounts.
+    """
+    accounts = accounts.dropna()
+    if pd.api.types.is_float_dtype(accounts) and (accounts % 1 == 0).all():
+        accounts = accounts.astype('int64')
+    return accounts.astype(str).str.strip().map(account_remarks).dropna()
 
 class SumishoProcessor(BaseProcessor):
     def process_daily_remark(self, file_content, sheet_name=None, preview_only=False,
@@ -11,11 +28,7 @@ class SumishoProcessor(BaseProcessor):
     template_content=None, template_sheet=None, target_column=None):
 
         try:
-            if isinstance(file_content, bytes):
-                file_content = io.BytesIO(file_content)
-                
-            xls = pd.ExcelFile(file_content)
-            df = pd.read_excel(xls, sheet_name=sheet_name)
+            df = self.read_sheet(file_content, sheet_name=sheet_name)
             df = self.clean_data(df, remove_duplicates, remove_blanks, trim_spaces)
 
             if 'Date' not in df.columns or 'Remark' not in df.columns or 'Account No.' not in df.columns:
@@ -34,25 +47,10 @@ class SumishoProcessor(BaseProcessor):
                 df = df.drop_duplicates(subset='Account No.', keep='first')
                 
             df['FormattedDate'] = pd.to_datetime(df['Date']).dt.strftime('%m/%d/%Y')
-            df['Date_Remark'] = df['FormattedDate'] + ' ' + df['Remark'].astype(str)
-            
-            account_remark_map = {}
-            for idx, row in df.iterrows():
-                account_number = str(int(row['Account No.']))
-                formatted_date = row.get('FormattedDate')
-                remark = row.get('Remark', '')
-
-                if pd.isna(formatted_date):
-                    value = str(remark) if pd.notna(remark) else ""
-                else:
-                    value = str(formatted_date) + ' ' + (str(remark) if pd.notna(remark) else "")
-                    
-                account_remark_map[account_number.strip()] = value
+            account_remarks = build_account_remarks(df)
             
             if preview_only:
-                template_stream = io.BytesIO(template_content)
-                template_xls = pd.ExcelFile(template_stream)
-                template_df = pd.read_excel(template_xls, sheet_name=template_sheet, header=1)
+                template_df = self.read_sheet(template_content, sheet_name=template_sheet, header=1)
                 
                 account_number_col = None
                 for col in template_df.columns:
@@ -62,68 +60,60 @@ class SumishoProcessor(BaseProcessor):
                         break
                         
                 if not account_number_col:
-                    st.write("Available columns:", template_df.columns.tolist())
+                    self.sink.info("Available columns:", template_df.columns.tolist())
                     raise ValueError("Account number column not found in template file.")
                     
-                updated_count = 0
-                for idx, row in template_df.iterrows():
-                    template_acct = str(row[account_number_col]).strip() if pd.notna(row[account_number_col]) else ""
-                    if template_acct in account_remark_map:
-                        template_df.loc[idx, target_column] = account_remark_map[template_acct]
-                        updated_count += 1
+                remarks = map_account_remarks(template_df[account_number_col], account_remarks)
+                updated_count = len(remarks)
+                if target_column in template_df.columns:
+                    template_df[target_column] = remarks.reindex(template_df.index).fillna(template_df[target_column].astype(object))
+                else:
+                    template_df[target_column] = remarks
                 
-                st.write(f"Preview: {updated_count} cells would be updated in the template")
+                self.sink.info(f"Preview: {updated_count} cells would be updated in the template")
                 return template_df
             
             output_filename = "Processed_Daily_Remark.xlsx"
-            output_path = os.path.join(self.temp_dir, output_filename)
             
-            template_stream = io.BytesIO(template_content)
-            workbook = load_workbook(template_stream)
+            workbook = XlsxPatcher(template_content)
             
-            if template_sheet in workbook.sheetnames:
-                sheet = workbook[template_sheet]
+            if template_sheet in workbook.sheet_names:
+                sheet = workbook.sheet(template_sheet)
             else:
-                sheet = workbook.active
-                st.warning(f"Sheet '{template_sheet}' not found, using active sheet instead")
+                sheet = workbook.sheet()
+                self.sink.warning(f"Sheet '{template_sheet}' not found, using active sheet instead")
             
             header_row = 2 
             account_col_idx = None
             target_col_idx = None
+            header_values = sheet.row_values(header_row)
             
-            for col_idx, cell in enumerate(sheet[header_row], 1):
-                cell_value = str(cell.value).upper() if cell.value else ""
+            for col_idx, value in enumerate(header_values, 1):
+                cell_value = str(value).upper() if value else ""
                 if cell_value and ('ACCOUNT' in cell_value and ('NUMBER' in cell_value or 'NO' in cell_value)):
                     account_col_idx = col_idx
-                if cell.value == target_column:
+                if value == target_column:
                     target_col_idx = col_idx
 
             if account_col_idx is None or target_col_idx is None:
-                st.write("Header row content:", [cell.value for cell in sheet[header_row]])
-                st.write(f"Looking for account column and target column: '{target_column}'")
+                self.sink.info("Header row content:", header_values)
+                self.sink.info(f"Looking for account column and target column: '{target_column}'")
                 raise ValueError("Could not locate columns in Excel sheet")
                 
-            update_count = 0
-            for row_idx in range(header_row + 1, sheet.max_row + 1):
-                account_cell = sheet.cell(row=row_idx, column=account_col_idx)
-                
-                if account_cell.value is not None:
-                    account_str = str(account_cell.value).strip()
-                    
-                    if account_str in account_remark_map:
-                        sheet.cell(row=row_idx, column=target_col_idx).value = account_remark_map[account_str]
-                        update_count += 1
-
-            st.write(f"Updated {update_count} cells in the Excel file")
-            workbook.save(output_path)
+            first_row = header_row + 1
+            sheet_accounts = pd.Series(sheet.column_values(account_col_idx, min_row=first_row), dtype=object)
+            remarks = map_account_remarks(sheet_accounts, account_remarks)
+            for offset, remark in remarks.items():
+                sheet.set_value(first_row + offset, target_col_idx, remark)
+            update_count = len(remarks)
 
-            with open(output_path, 'rb') as f:
-                output_binary = f.read()
+            self.sink.info(f"Updated {update_count} cells in the Excel file")
+            output_binary = workbook.save()
 
             return None, output_binary, output_filename
 
         except Exception as e:
-            st.error(f"Error processing daily report: {str(e)}")
+            self.sink.error(f"Error processing daily report: {str(e)}")
             import traceback
-            st.write(traceback.format_exc())
+            self.sink.info(traceback.format_exc())
             raise
@@ -0,0 +1,589 @@
+import io
+import re
+import zipfile
+import posixpath
+from html import unescape
+from xml.sax.saxutils import escape
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles.numbers import BUILTIN_FORMATS_REVERSE
+from openpyxl.utils import get_column_letter, column_index_from_string
+
+_ATTR_RE = re.compile(r'([\w:.-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+_REF_RE = re.compile(r'([A-Z]+)(\d+)')
+_ILLEGAL_CHARS_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_TEXT_RE = re.compile(r'<(?:\w+:)?t(?:\s[^>]*)?>(.*?)</(?:\w+:)?t>', re.S)
+_PHONETIC_RE = re.compile(r'<((?:\w+:)?)rPh\b.*?</\1rPh>', re.S)
+
+THIN_BORDER_XML = '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>'
+
+def _parse_attrs(text):
+    return {m.group(1): m.group(2) if m.group(2) is not None else m.group(3) for m in _ATTR_RE.finditer(text)}
+
+def _format_attrs(attrs):
+    return ''.join(f' {key}="{value}"' for key, value in attrs.items())
+
+def _rich_text(xml):
+    return ''.join(unescape(text) for text in _TEXT_RE.findall(_PHONETIC_RE.sub('', xml)))
+
+def _append_child(xml, collection, element, child):
+    """
+    Append element to the <collection> list in xml and bump its count.
+    Returns the new xml and the position of the appended element.
+    """
+    match = re.search(rf'<((?:\w+:)?){collection}\b([^>]*?)(?:/>|>(.*?)</\1{collection}>)', xml, re.S)
+    prefix, body = match.group(1), match.group(3) or ''
+    index = len(re.findall(rf'<{re.escape(prefix)}{child}\b', body))
+    attrs = _parse_attrs(match.group(2))
+    attrs['count'] = str(index + 1)
+    updated = f'<{prefix}{collection}{_format_attrs(attrs)}>{body}{element}</{prefix}{collection}>'
+    return xml[:match.start()] + updated + xml[match.end():], index
+
+def split_ref(ref):
+    """'C12' -> (12, 3)"""
+    letters, digits = _REF_RE.match(ref).groups()
+    return int(digits), column_index_from_string(letters)
+
+class _Row:
+    __slots__ = ('attrs', 'xml', 'inner', 'cells', 'dirty')
+
+    def __init__(self, attrs, xml='', inner=''):
+        self.attrs = attrs
+        self.xml = xml
+        self.inner = inner
+        self.cells = None
+        self.dirty = False
+
+class XlsxSheet:
+    """
+    One worksheet's XML, split into rows so single cells can be read and replaced.
+
+    Rows are only broken into cells when they are read or written, and rows that
+    are never written are serialized back exactly as they were read.
+    """
+    def __init__(self, xml, shared_strings):
+        self._shared_strings = shared_strings
+        self.prefix = re.search(r'<(\w+:)?worksheet\b', xml).group(1) or ''
+        p = re.escape(self.prefix)
+        self._row_re = re.compile(rf'<{p}row\b([^>]*?)(?:/>|>(.*?)</{p}row>)', re.S)
+        self._cell_re = re.compile(rf'<{p}c\b([^>]*?)(?:/>|>(.*?)</{p}c>)', re.S)
+        self._value_re = re.compile(rf'<{p}v(?:\s[^>]*)?>(.*?)</{p}v>', re.S)
+        self._formula_re = re.compile(rf'<{p}f[\s>/]')
+
+        sheet_data = re.search(rf'<{p}sheetData\b[^>]*?(?:/>|>(.*?)</{p}sheetData>)', xml, re.S)
+        self._head = xml[:sheet_data.start()]
+        self._tail = xml[sheet_data.end():]
+
+        self._rows = {}
+        row_idx = 0
+        for match in self._row_re.finditer(sheet_data.group(1) or ''):
+            attrs = _parse_attrs(match.group(1))
+            row_idx = int(attrs['r']) if 'r' in attrs else row_idx + 1
+            self._rows[row_idx] = _Row(attrs, match.group(0), match.group(2) or '')
+
+        self.modified = False
+        self.formulas_overwritten = False
+        self._written = None
+
+    @property
+    def max_row(self):
+        """Last row holding at least one cell (rows that only carry formatting don't count)."""
+        for row_idx in sorted(self._rows, reverse=True):
+            row = self._rows[row_idx]
+            if row.cells if row.cells is not None else self._cell_re.search(row.inner):
+                return row_idx
+        return 0
+
+    @property
+    def has_formulas(self):
+        return any(self._formula_re.search(row.inner) for row in self._rows.values())
+
+    def merged_top_left(self, row_idx, col_idx):
+        """The top-left cell of the merged range containing a cell (the cell itself if not merged)."""
+        p = re.escape(self.prefix)
+        for ref in re.findall(rf'<{p}mergeCell\b[^>]*?\bref="([^"]+)"', self._tail):
+            first, _, last = ref.partition(':')
+            min_row, min_col = split_ref(first)
+            max_row, max_col = split_ref(last or first)
+            if min_row <= row_idx <= max_row and min_col <= col_idx <= max_col:
+                return min_row, min_col
+        return row_idx, col_idx
+
+    def set_column_widths(self, widths):
+        """
+        Give each {col_idx: width} column a custom width. Other attributes of a <col>
+        entry that already covers the column (style, hidden) are kept.
+        """
+        p = self.prefix
+        cols = re.search(rf'<{re.escape(p)}cols\b[^>]*?(?:/>|>(.*?)</{re.escape(p)}cols>)', self._head, re.S)
+        spans = []
+        covering = {}
+        for match in re.finditer(rf'<{re.escape(p)}col\b([^>]*?)/?>', (cols.group(1) or '') if cols else ''):
+            attrs = _parse_attrs(match.group(1))
+            min_col, max_col = int(attrs.pop('min')), int(attrs.pop('max'))
+            start = min_col
+            for col_idx in sorted(col for col in widths if min_col <= col <= max_col):
+                if col_idx > start:
+                    spans.append((start, col_idx - 1, attrs))
+                covering[col_idx] = attrs
+                start = col_idx + 1
+            if start <= max_col:
+                spans.append((start, max_col, attrs))
+        for col_idx, width in widths.items():
+            spans.append((col_idx, col_idx, {**covering.get(col_idx, {}), 'width': str(width), 'customWidth': '1'}))
+
+        entries = ''.join(f'<{p}col min="{min_col}" max="{max_col}"{_format_attrs(attrs)}/>'
+                          for min_col, max_col, attrs in sorted(spans, key=lambda span: span[0]))
+        xml = f'<{p}cols>{entries}</{p}cols>' if entries else ''
+        if cols is None:
+            self._head += xml
+        else:
+            self._head = self._head[:cols.start()] + xml + self._head[cols.end():]
+        self.modified = True
+
+    def _cells(self, row):
+        if row.cells is None:
+            cells = {}
+            col_idx = 0
+            for match in self._cell_re.finditer(row.inner):
+                attrs = _parse_attrs(match.group(1))
+                col_idx = split_ref(attrs['r'])[1] if 'r' in attrs else col_idx + 1
+                cells[col_idx] = [attrs, match.group(2) or '', match.group(0)]
+            row.cells = cells
+        return row.cells
+
+    def _read(self, attrs, inner):
+        cell_type = attrs.get('t', 'n')
+        if cell_type == 'inlineStr':
+            return _rich_text(inner)
+        value = self._value_re.search(inner)
+        if value is None:
+            return None
+        value = unescape(value.group(1))
+        if cell_type == 's':
+            return self._shared_strings()[int(value)]
+        if cell_type == 'b':
+            return value.strip() == '1'
+        if cell_type in ('str', 'e', 'd'):
+            return value
+        if '.' in value or 'E' in value or 'e' in value:
+            return float(value)
+        return int(value)
+
+    def value(self, row_idx, col_idx):
+        """Cached value of a cell (formulas are not evaluated), or None."""
+        row = self._rows.get(row_idx)
+        cell = self._cells(row).get(col_idx) if row is not None else None
+        return self._read(cell[0], cell[1]) if cell is not None else None
+
+    def row_values(self, row_idx):
+        """Values of one row from column A up to its last cell, None for gaps."""
+        row = self._rows.get(row_idx)
+        if row is None:
+            return []
+        cells = self._cells(row)
+        return [self._read(cells[col][0], cells[col][1]) if col in cells else None
+                for col in range(1, max(cells, default=0) + 1)]
+
+    def column_values(self, col_idx, min_row=1, max_row=None):
+        """Values of one column for rows min_row..max_row (default: last row)."""
+        max_row = self.max_row if max_row is None else max_row
+        p = re.escape(self.prefix)
+        # Pick the column's cell out of each row by reference instead of splitting every row
+        cell_re = re.compile(rf'<{p}c\b(?=[^>]*?\sr="{get_column_letter(col_idx)}\d+")([^>]*?)(?:/>|>(.*?)</{p}c>)', re.S)
+        values = []
+        for row_idx in range(min_row, max_row + 1):
+            row = self._rows.get(row_idx)
+            if row is None:
+                values.append(None)
+                continue
+            match = cell_re.search(row.inner) if row.cells is None else None
+            if match is not None:
+                values.append(self._read(_parse_attrs(match.group(1)), match.group(2) or ''))
+            else:
+                values.append(self.value(row_idx, col_idx))
+        return values
+
+    def style(self, row_idx, col_idx):
+        """Style (xf) index of a cell, 0 when the cell does not exist."""
+        row = self._rows.get(row_idx)
+        cell = self._cells(row).get(col_idx) if row is not None else None
+        return int(cell[0].get('s', 0)) if cell is not None else 0
+
+    def _encode(self, value):
+        p = self.prefix
+        if value is None or value is pd.NA or value is pd.NaT or value == '' or (isinstance(value, float) and value != value):
+            return None, ''
+        if isinstance(value, (bool, np.bool_)):
+            return 'b', f'<{p}v>{int(value)}</{p}v>'
+        if isinstance(value, (int, np.integer)):
+            return None, f'<{p}v>{int(value)}</{p}v>'
+        if isinstance(value, (float, np.floating)):
+            return None, f'<{p}v>{float(value):.16g}</{p}v>'
+        text = _ILLEGAL_CHARS_RE.sub('', str(value))
+        space = ' xml:space="preserve"' if text != text.strip() or '\n' in text else ''
+        return 'inlineStr', f'<{p}is><{p}t{space}>{escape(text)}</{p}t></{p}is>'
+
+    def set_value(self, row_idx, col_idx, value, style=None):
+        """
+        Write a value into a cell, keeping the cell's existing style unless a style
+        (xf index) is given. Strings are written inline, so sharedStrings is untouched.
+        """
+        row = self._rows.get(row_idx)
+        if row is None:
+            row = self._rows[row_idx] = _Row({'r': str(row_idx)})
+            row.cells = {}
+        cells = self._cells(row)
+
+        cell = cells.get(col_idx)
+        attrs = {'r': f'{get_column_letter(col_idx)}{row_idx}'}
+        if cell is not None:
+            if self._formula_re.search(cell[1]):
+                self.formulas_overwritten = True
+            attrs.update((key, val) for key, val in cell[0].items() if key not in ('r', 't', 'cm', 'vm'))
+        if style is not None:
+            attrs['s'] = str(style)
+
+        cell_type, inner = self._encode(value)
+        if cell_type:
+            attrs['t'] = cell_type
+        cells[col_idx] = [attrs, inner, None]
+
+        row.dirty = True
+        self.modified = True
+        if self._written is None:
+            self._written = [row_idx, col_idx, row_idx, col_idx]
+        else:
+            written = self._written
+            written[:] = [min(written[0], row_idx), min(written[1], col_idx),
+                          max(written[2], row_idx), max(written[3], col_idx)]
+
+    def set_values(self, values, style=None):
+        """Write a {'A1': value} or {(row, col): value} mapping."""
+        for key, value in values.items():
+            row_idx, col_idx = split_ref(key) if isinstance(key, str) else key
+            self.set_value(row_idx, col_idx, value, style)
+
+    def append_rows(self, rows, style=None, start_col=1):
+        """
+        Write rows of values below the last row holding cells, one row element per
+        row built straight into XML. Every cell gets the style index (blank values
+        included, so a bordered block stays closed). Returns the first and last row
+        written, or None when rows is empty.
+        """
+        p = self.prefix
+        first_row = self.max_row + 1
+        style_attr = f' s="{style}"' if style is not None else ''
+        row_idx = first_row - 1
+        max_col = start_col - 1
+        for row_idx, values in enumerate(rows, first_row):
+            parts = []
+            for col_idx, value in enumerate(values, start_col):
+                ref = f'{get_column_letter(col_idx)}{row_idx}'
+                cell_type, inner = self._encode(value)
+                if inner:
+                    type_attr = f' t="{cell_type}"' if cell_type else ''
+                    parts.append(f'<{p}c r="{ref}"{style_attr}{type_attr}>{inner}</{p}c>')
+                elif style_attr:
+                    parts.append(f'<{p}c r="{ref}"{style_attr}/>')
+                max_col = max(max_col, col_idx)
+            existing = self._rows.get(row_idx)
+            attrs = {key: value for key, value in existing.attrs.items() if key != 'spans'} if existing else {'r': str(row_idx)}
+            xml = f'<{p}row{_format_attrs(attrs)}>{"".join(parts)}</{p}row>'
+            self._rows[row_idx] = _Row(attrs, xml, xml[xml.index('>') + 1:-len(f'</{p}row>')])
+        if row_idx < first_row:
+            return None
+
+        self.modified = True
+        written = self._written or [first_row, start_col, row_idx, max_col]
+        self._written = [min(written[0], first_row), min(written[1], start_col),
+                         max(written[2], row_idx), max(written[3], max_col)]
+        return first_row, row_idx
+
+    def _row_xml(self, row):
+        p = self.prefix
+        attrs = {key: value for key, value in row.attrs.items() if key != 'spans'}
+        parts = [f'<{p}row{_format_attrs(attrs)}>']
+        for col_idx in sorted(row.cells):
+            attrs, inner, raw = row.cells[col_idx]
+            if raw is not None:
+                parts.append(raw)
+            elif inner:
+                parts.append(f'<{p}c{_format_attrs(attrs)}>{inner}</{p}c>')
+            else:
+                parts.append(f'<{p}c{_format_attrs(attrs)}/>')
+        parts.append(f'</{p}row>')
+        return ''.join(parts)
+
+    def _dimension_head(self):
+        if self._written is None:
+            return self._head
+        p = re.escape(self.prefix)
+        match = re.search(rf'(<{p}dimension\b[^>]*?\bref=")([^"]*)(")', self._head)
+        if match is None:
+            return self._head
+        min_row, min_col, max_row, max_col = self._written
+        for ref in match.group(2).split(':'):
+            if _REF_RE.fullmatch(ref):
+                row_idx, col_idx = split_ref(ref)
+                min_row, min_col = min(min_row, row_idx), min(min_col, col_idx)
+                max_row, max_col = max(max_row, row_idx), max(max_col, col_idx)
+        ref = f'{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{max_row}'
+        return self._head[:match.start(2)] + ref + self._head[match.end(2):]
+
+    def to_xml(self):
+        p = self.prefix
+        if not self._rows:
+            return f'{self._dimension_head()}<{p}sheetData/>{self._tail}'
+        rows = [self._row_xml(row) if row.dirty else row.xml for _, row in sorted(self._rows.items())]
+        return f'{self._dimension_head()}<{p}sheetData>{"".join(rows)}</{p}sheetData>{self._tail}'
+
+class XlsxPatcher:
+    """
+    Edit cell values in an existing .xlsx package without loading it into openpyxl.
+
+    Only the sheets that are asked for are parsed, and only the ones written to are
+    re-serialized; every other part (styles, drawings, other sheets) is copied through
+    with its bytes unchanged.
+    """
+    def __init__(self, data):
+        self._zip = zipfile.ZipFile(io.BytesIO(data))
+        self._names = set(self._zip.namelist())
+        self._parts = {}
+        self._sheets = {}
+        self._shared_strings = None
+
+        workbook_path = 'xl/workbook.xml'
+        for rel in self._relationships('_rels/.rels', ''):
+            if rel['Type'].endswith('/officeDocument'):
+                workbook_path = rel['Target']
+        self.workbook_path = workbook_path
+        self._rels_path = posixpath.join(posixpath.dirname(workbook_path), '_rels',
+                                         posixpath.basename(workbook_path) + '.rels')
+
+        rels = {rel['Id']: rel for rel in self._relationships(self._rels_path, posixpath.dirname(workbook_path))}
+        workbook = self.read_part(workbook_path)
+        self._sheet_paths = {}
+        for match in re.finditer(r'<(?:\w+:)?sheet\b([^>]*?)/?>', workbook):
+            attrs = _parse_attrs(match.group(1))
+            rel_id = next(value for key, value in attrs.items() if key.endswith(':id'))
+            self._sheet_paths[unescape(attrs['name'])] = rels[rel_id]['Target']
+        self._shared_strings_path = next(
+            (rel['Target'] for rel in rels.values() if rel['Type'].endswith('/sharedStrings')), None)
+        self._calc_chain_path = next(
+            (rel['Target'] for rel in rels.values() if rel['Type'].endswith('/calcChain')), None)
+        self.styles_path = next(
+            (rel['Target'] for rel in rels.values() if rel['Type'].endswith('/styles')), None)
+        self._derived_styles = {}
+        self._borders = {}
+
+        active = re.search(r'<(?:\w+:)?workbookView\b[^>]*?\bactiveTab="(\d+)"', workbook)
+        names = list(self._sheet_paths)
+        self.active_sheet_name = names[int(active.group(1))] if active and int(active.group(1)) < len(names) else names[0]
+
+    def _relationships(self, path, base_dir):
+        if path not in self._names:
+            return []
+        rels = []
+        for match in re.finditer(r'<(?:\w+:)?Relationship\b([^>]*?)/?>', self.read_part(path)):
+            attrs = _parse_attrs(match.group(1))
+            target = unescape(attrs.get('Target', ''))
+            if attrs.get('TargetMode') != 'External':
+                target = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join(base_dir, target))
+            rels.append({'Id': attrs.get('Id'), 'Type': attrs.get('Type', ''), 'Target': target})
+        return rels
+
+    @property
+    def sheet_names(self):
+        return list(self._sheet_paths)
+
+    def read_part(self, name):
+        data = self._parts.get(name)
+        if data is None:
+            data = self._zip.read(name)
+        return data.decode('utf-8')
+
+    def write_part(self, name, text):
+        self._parts[name] = text.encode('utf-8')
+
+    def remove_part(self, name):
+        self._parts[name] = None
+
+    def shared_strings(self):
+        if self._shared_strings is None:
+            self._shared_strings = []
+            if self._shared_strings_path in self._names:
+                xml = self.read_part(self._shared_strings_path)
+                self._shared_strings = [_rich_text(item) for item in
+                                        re.findall(r'<(?:\w+:)?si\b[^>]*/>|<(?:\w+:)?si\b[^>]*>(.*?)</(?:\w+:)?si>', xml, re.S)]
+        return self._shared_strings
+
+    def sheet(self, name=None):
+        """The named worksheet (the active one by default); KeyError if it does not exist."""
+        path = self._sheet_paths[self.active_sheet_name if name is None else name]
+        if path not in self._sheets:
+            self._sheets[path] = XlsxSheet(self.read_part(path), self.shared_strings)
+        return self._sheets[path]
+
+    def number_format_id(self, format_code):
+        """numFmtId for a format code: a built-in id, an existing custom one, or a new one."""
+        if format_code in BUILTIN_FORMATS_REVERSE:
+            return BUILTIN_FORMATS_REVERSE[format_code]
+        styles = self.read_part(self.styles_path)
+        ids = [163]
+        for match in re.finditer(r'<(?:\w+:)?numFmt\b([^>]*?)/?>', styles):
+            attrs = _parse_attrs(match.group(1))
+            if unescape(attrs.get('formatCode', '')) == format_code:
+                return int(attrs['numFmtId'])
+            ids.append(int(attrs['numFmtId']))
+
+        num_fmt_id = max(ids) + 1
+        prefix = re.search(r'<(\w+:)?styleSheet\b', styles).group(1) or ''
+        num_fmt = f'<{prefix}numFmt numFmtId="{num_fmt_id}" formatCode="{escape(format_code, {chr(34): "&quot;"})}"/>'
+        if re.search(r'<(?:\w+:)?numFmts\b', styles):
+            styles = _append_child(styles, 'numFmts', num_fmt, 'numFmt')[0]
+        else:
+            root = re.search(r'<(?:\w+:)?styleSheet\b[^>]*>', styles)
+            styles = f'{styles[:root.end()]}<{prefix}numFmts count="1">{num_fmt}</{prefix}numFmts>{styles[root.end():]}'
+        self.write_part(self.styles_path, styles)
+        return num_fmt_id
+
+    def add_border(self, border_xml):
+        """borderId of a <border> element (written without a namespace prefix), added once."""
+        if not isinstance(border_xml, str):
+            raise TypeError(f"add_border expects <border> XML text, not {type(border_xml).__name__}")
+        if border_xml not in self._borders:
+            styles = self.read_part(self.styles_path)
+            prefix = re.search(r'<(\w+:)?styleSheet\b', styles).group(1) or ''
+            element = re.sub(r'<(/?)(\w+)', rf'<\1{prefix}\2', border_xml) if prefix else border_xml
+            styles, self._borders[border_xml] = _append_child(styles, 'borders', element, 'border')
+            self.write_part(self.styles_path, styles)
+        return self._borders[border_xml]
+
+    def derive_style(self, xf_index, number_format=None, border_id=None):
+        """
+        Index of a new cell style copying cellXfs[xf_index] with a different number
+        format and/or border. Each combination is only added once per package.
+        """
+        key = (xf_index, number_format, border_id)
+        if key not in self._derived_styles:
+            attrs_update = {}
+            if number_format is not None:
+                attrs_update.update(numFmtId=str(self.number_format_id(number_format)), applyNumberFormat='1')
+            if border_id is not None:
+                attrs_update.update(borderId=str(border_id), applyBorder='1')
+
+            styles = self.read_part(self.styles_path)
+            cell_xfs = re.search(r'<((?:\w+:)?)cellXfs\b[^>]*>(.*?)</\1cellXfs>', styles, re.S)
+            prefix = re.escape(cell_xfs.group(1))
+            base = re.findall(rf'<{prefix}xf\b[^>]*?(?:/>|>.*?</{prefix}xf>)', cell_xfs.group(2), re.S)[xf_index]
+            tag = re.match(rf'<{prefix}xf\b([^>]*?)(/?)>', base)
+            attrs = {**_parse_attrs(tag.group(1)), **attrs_update}
+            xf = f'<{cell_xfs.group(1)}xf{_format_attrs(attrs)}{tag.group(2)}>{base[tag.end():]}'
+            styles, self._derived_styles[key] = _append_child(styles, 'cellXfs', xf, 'xf')
+            self.write_part(self.styles_path, styles)
+        return self._derived_styles[key]
+
+    def _drop_calc_chain(self):
+        """
+        Remove calcChain.xml. A calc chain that still lists an overwritten formula
+        cell is reported as corrupt; Excel rebuilds it on the next save.
+        """
+        if self._calc_chain_path and self._calc_chain_path in self._names:
+            self.remove_part(self._calc_chain_path)
+            rels = self.read_part(self._rels_path)
+            self.write_part(self._rels_path, re.sub(
+                r'<(?:\w+:)?Relationship\b[^>]*?Type="[^"]*/calcChain"[^>]*?/>', '', rels))
+            content_types = self.read_part('[Content_Types].xml')
+            self.write_part('[Content_Types].xml', re.sub(
+                r'<(?:\w+:)?Override\b[^>]*?PartName="/' + re.escape(self._calc_chain_path) + r'"[^>]*?/>', '', content_types))
+
+    def _force_full_calc(self):
+        """Make Excel recalculate on open, since cached formula results may now be stale."""
+        workbook = self.read_part(self.workbook_path)
+        calc_pr = re.search(r'<((?:\w+:)?)calcPr\b([^>]*?)/>', workbook)
+        if calc_pr:
+            attrs = _parse_attrs(calc_pr.group(2))
+            attrs['fullCalcOnLoad'] = '1'
+            workbook = f'{workbook[:calc_pr.start()]}<{calc_pr.group(1)}calcPr{_format_attrs(attrs)}/>{workbook[calc_pr.end():]}'
+        else:
+            # calcPr follows sheets/functionGroups/externalReferences/definedNames in the schema
+            anchor = None
+            for match in re.finditer(r'</((?:\w+:)?)(?:sheets|functionGroups|externalReferences|definedNames)>', workbook):
+                anchor = match
+            if anchor is not None:
+                workbook = f'{workbook[:anchor.end()]}<{anchor.group(1)}calcPr fullCalcOnLoad="1"/>{workbook[anchor.end():]}'
+        self.write_part(self.workbook_path, workbook)
+
+    def save(self):
+        """Return the patched package as bytes."""
+        modified = [(path, sheet) for path, sheet in self._sheets.items() if sheet.modified]
+        for path, sheet in modified:
+            self.write_part(path, sheet.to_xml())
+        if any(sheet.formulas_overwritten for _, sheet in modified):
+            self._drop_calc_chain()
+        if any(sheet.formulas_overwritten or sheet.has_formulas for _, sheet in modified):
+            self._force_full_calc()
+
+        output = io.BytesIO()
+        with zipfile.ZipFile(output, 'w') as package:
+            for info in self._zip.infolist():
+                data = self._parts[info.filename] if info.filename in self._parts else self._zip.read(info.filename)
+                if data is None:
+                    continue
+                member = zipfile.ZipInfo(info.filename, info.date_time)
+                member.compress_type = info.compress_type
+                member.external_attr = info.external_attr
+                package.writestr(member, data)
+        return output.getvalue()
+
+class CellMapTemplate:
+    """
+    A template whose outputs only differ in a fixed set of cells.
+
+    Merged-cell targets, derived number-format styles and, with autofit, the widths
+    every column needs for the cells that never change are worked out once. render()
+    then only patches the mapped cells and column widths into the sheet XML.
+    """
+    def __init__(self, data, cells, number_formats=None, autofit=False, sheet_name=None):
+        self.data = data
+        self.sheet_name = sheet_name
+        patcher = XlsxPatcher(data)
+        sheet = patcher.sheet(sheet_name)
+
+        self.targets = {ref: sheet.merged_top_left(*split_ref(ref)) for ref in cells}
+        self.styles = {}
+        for ref, number_format in (number_formats or {}).items():
+            row_idx, col_idx = self.targets[ref]
+            self.styles[ref] = patcher.derive_style(sheet.style(row_idx, col_idx), number_format=number_format)
+        self.styles_xml = patcher.read_part(patcher.styles_path) if self.styles else None
+
+        self.widths = None
+        if autofit:
+            # Same rule as sizing every column to its longest value with openpyxl, minus
+            # the target cells, whose values are only known at render time
+            worksheet = load_workbook(io.BytesIO(data))[sheet_name] if sheet_name else load_workbook(io.BytesIO(data)).active
+            target_cells = set(self.targets.values())
+            max_col = max([worksheet.max_column] + [col_idx for _, col_idx in target_cells])
+            self.widths = {}
+            for column in worksheet.iter_cols(min_col=1, max_col=max_col, min_row=1, max_row=worksheet.max_row):
+                lengths = [len(str(cell.value)) for cell in column
+                           if cell.value and (cell.row, cell.column) not in target_cells]
+                self.widths[column[0].column] = max(lengths, default=0)
+
+    def render(self, values):
+        """Bytes of the template with {ref: value} written into the mapped cells."""
+        patcher = XlsxPatcher(self.data)
+        sheet = patcher.sheet(self.sheet_name)
+        widths = dict(self.widths) if self.widths is not None else None
+        for ref, value in values.items():
+            row_idx, col_idx = self.targets[ref]
+            sheet.set_value(row_idx, col_idx, value, self.styles.get(ref))
+            if widths is not None and value:
+                widths[col_idx] = max(widths.get(col_idx, 0), len(str(value)))
+        if widths is not None:
+            sheet.set_column_widths({col_idx: length + 2 for col_idx, length in widths.items()})
+        if self.styles_xml is not None:
+            patcher.write_part(patcher.styles_path, self.styles_xml)
+        return patcher.save()
@@ -0,0 +1,15 @@
+import pytest
+
+from processor.reporting import CollectingSink
+
+
+@pytest.fixture(autouse=True)
+def supabase_env(monkeypatch):
+    # Processors build a Supabase client on init; nothing here talks to it
+    monkeypatch.setenv("SUPABASE_URL", "http://127.0.0.1:9")
+    monkeypatch.setenv("SUPABASE_KEY", "x" * 40)
+
+
+@pytest.fixture
+def sink():
+    return CollectingSink()
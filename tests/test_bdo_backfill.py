@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from processor.bdo_auto import backfill_system_officer
+
+
+def legacy_backfill(officers):
+    """The row loop backfill_system_officer replaced, kept to check equivalence."""
+    df = pd.DataFrame({"HANDLING OFFICER2": officers}).reset_index(drop=True)
+    for i in range(1, len(df)):
+        if df.loc[i, "HANDLING OFFICER2"] == "SYSTEM":
+            df.loc[i, "HANDLING OFFICER2"] = df.loc[i - 1, "HANDLING OFFICER2"]
+    return df["HANDLING OFFICER2"].tolist()
+
+
+def test_matches_legacy_loop():
+    rng = np.random.default_rng(0)
+    officers = pd.Series(rng.choice(["SYSTEM", "ANNA", "BEN", None], size=500, p=[0.5, 0.2, 0.2, 0.1]))
+    officers.iloc[:3] = "SYSTEM"
+    assert backfill_system_officer(officers).tolist() == legacy_backfill(officers)
+
+
+def test_leading_system_and_empty_input():
+    result = backfill_system_officer(pd.Series(["SYSTEM", "SYSTEM", "ANNA", "SYSTEM"], index=[7, 3, 9, 1]))
+    assert result.tolist() == ["SYSTEM", "SYSTEM", "ANNA", "ANNA"]
+    assert result.index.tolist() == [7, 3, 9, 1]
+    assert backfill_system_officer(pd.Series([], dtype=object)).empty
+
+
+def test_group_keys_keep_officers_within_an_account():
+    officers = pd.Series(["ANNA", "SYSTEM", "BEN", "SYSTEM", "SYSTEM", "SYSTEM"])
+    accounts = pd.Series(["PN1", "PN2", "PN2", "PN1", "PN2", "PN3"])
+    assert backfill_system_officer(officers, group_keys=accounts).tolist() == \
+        ["ANNA", "SYSTEM", "BEN", "ANNA", "BEN", "SYSTEM"]
+    assert backfill_system_officer(officers).tolist() == ["ANNA", "ANNA", "BEN", "BEN", "BEN", "BEN"]
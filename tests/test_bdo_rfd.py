@@ -0,0 +1,93 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from processor.bdo_auto import extract_rfd, default_rfd
+
+VALID_CODES = {"BUSY", "NISV", "NABZ", "DECD", "OTS", "RTP"}
+
+
+def legacy_extract_rfd(remark):
+    """The per-remark apply that extract_rfd replaced, kept to check equivalence."""
+    remark = str(remark).strip().rstrip("\\")
+    rfd_match = re.search(r"RFD:\s*(\S+)$", remark)
+    if rfd_match:
+        rfd = rfd_match.group(1).upper()
+    else:
+        last_word = re.findall(r"\\\s*(\S+)", remark)
+        if last_word:
+            rfd = last_word[-1].upper()
+        else:
+            last_word = remark.split()[-1] if remark else np.nan
+            rfd = last_word.upper() if last_word else np.nan
+    return rfd if rfd in VALID_CODES else np.nan
+
+
+def assert_rfd(remark, expected):
+    result = extract_rfd(pd.Series([remark]), VALID_CODES).iloc[0]
+    if pd.isna(expected):
+        assert pd.isna(result)
+    else:
+        assert result == expected
+
+
+@pytest.mark.parametrize("remark, expected", [
+    ("Called client RFD: ots", "OTS"),
+    ("RFD:RTP   ", "RTP"),
+    ("left message RFD: decd\\", "DECD"),
+    ("RFD: decd\\\\\\", "DECD"),
+    ("RFD: FOO", np.nan),
+    ("RFD: OTS then called again", np.nan),
+])
+def test_trailing_rfd_marker(remark, expected):
+    assert_rfd(remark, expected)
+
+
+@pytest.mark.parametrize("remark, expected", [
+    ("left msg \\ decd", "DECD"),
+    ("left msg \\ decd\nfollow up \\\tnisv", "NISV"),
+    ("no answer\\\nBUSY\\", "BUSY"),
+    ("no answer \\\r\n\tnabz  ", "NABZ"),
+    ("client \\ OTS \\ unknown", np.nan),
+    ("RFD: OTS \\ nisv", "NISV"),
+])
+def test_backslash_delimited_codes(remark, expected):
+    assert_rfd(remark, expected)
+
+
+def test_last_word_fallback_and_invalid_codes():
+    remarks = pd.Series(["customer busy", "customer busy today", "", None, np.nan])
+    result = extract_rfd(remarks, VALID_CODES)
+    assert result.iloc[0] == "BUSY"
+    assert result.iloc[1:].isna().all()
+
+
+@pytest.mark.parametrize("remark", ["\\", "\\\\\\", "  \\  ", "\\\n"])
+def test_lone_backslash_has_no_code(remark):
+    # The per-remark version raised AttributeError here and aborted the report
+    assert_rfd(remark, np.nan)
+
+
+def test_matches_legacy_extraction():
+    remarks = pd.Series([
+        "Called client RFD: ots", "RFD:RTP   ", "left message RFD: decd\\",
+        "left msg \\ decd\nfollow up \\\tnisv", "no answer\\\nBUSY\\",
+        "client \\ OTS \\ unknown", "RFD: OTS \\ nisv", "customer busy",
+        "customer busy today", "RFD:", "rfd: ots", "x \\", 12345, None,
+    ], index=range(10, 24))
+    result = extract_rfd(remarks, VALID_CODES)
+    expected = remarks.map(legacy_extract_rfd)
+    pd.testing.assert_series_equal(result.astype(object), expected.astype(object), check_names=False)
+
+
+def test_default_rfd_from_bank_status():
+    rfd = pd.Series([np.nan, "NISV", "NABZ", "OTS", np.nan, "OTS", np.nan, "NISV", np.nan],
+                    index=range(5, 14))
+    status = pd.Series(["PTP", "PTP", "PTP", "PTP", "CALL NO PTP", "CALL NO PTP", "UNCON", "UNCON", "OTHER"],
+                       index=range(5, 14))
+    result = default_rfd(rfd, status)
+    assert result.index.equals(rfd.index)
+    assert result.iloc[:8].tolist() == ["BUSY", "BUSY", "BUSY", "OTS", "NISV", "OTS", "NABZ", "NISV"]
+    assert pd.isna(result.iloc[8])
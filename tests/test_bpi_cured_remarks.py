@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import openpyxl
+import pytest
+
+from processor.bpi_auto_curing import BPIAutoCuringProcessor, CURED_LIST_COLUMNS
+
+
+def cured_list_file(path, rows):
+    """Write a cured list with CURED_LIST_COLUMNS columns; rows are dicts of 0-based column: value."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append([f"H{i}" for i in range(1, CURED_LIST_COLUMNS + 1)])
+    for values in rows:
+        row = [None] * CURED_LIST_COLUMNS
+        for col, value in values.items():
+            row[col] = value
+        ws.append(row)
+    wb.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def processor(sink):
+    return BPIAutoCuringProcessor(sink=sink)
+
+
+def test_blank_barcode_keeps_none_in_remarks(processor, tmp_path):
+    path = cured_list_file(tmp_path / "cured.xlsx", [
+        {0: "BC1", 1: "AGENT1", 2: datetime(2024, 1, 5, 9, 30), 3: 1500, 41: "9171234567"},
+        {0: None, 1: "AGENT2", 2: datetime(2024, 1, 6), 3: 200, 41: "09181234567"},
+        {0: "", 1: "AGENT2", 2: "2024-01-07", 3: 300},
+    ])
+    remarks = processor.build_cured_remarks(processor.scan_cured_list(path))
+
+    by_status = remarks.groupby("Action Status")["Remark"].apply(list)
+    assert by_status["PTP NEW - CALL OUTS_PASTDUE"] == [
+        "1_09171234567 - PTP NEW", "1_None - PTP NEW", "1_None - PTP NEW"]
+    assert by_status["PTP FF UP - CLIENT ANSWERED AND WILL SETTLE"] == [
+        "09171234567 - FPTP", "None - FPTP", "None - FPTP"]
+    assert by_status["PAYMENT - CURED"] == ["CURED - CONFIRM VIA SELECTIVE LIST"] * 3
+
+    blank = remarks[remarks["LAN"].isin([None, ""])]
+    assert (blank["Remark Date"] == "").all()
+    is_payment = blank["Action Status"] == "PAYMENT - CURED"
+    assert blank.loc[~is_payment, "Phone No."].isna().all()
+    assert (blank.loc[is_payment, "Phone No."] == "").all()
+
+
+def test_empty_phones_render_blank(processor, tmp_path):
+    path = cured_list_file(tmp_path / "cured.xlsx", [
+        {0: "BC1", 1: "AGENT1", 2: "2024-03-04 10:11:12", 3: 100, 7: "PTP"},
+    ])
+    remarks = processor.build_cured_remarks(processor.scan_cured_list(path))
+
+    assert remarks["Remark"].tolist() == [" - FPTP", "CURED - CONFIRM VIA SELECTIVE LIST"]
+    assert remarks["Remark Date"].tolist() == ["03/04/2024 02:50:00 PM", "03/04/2024 03:00:00 PM"]
+    assert remarks["Claim Paid Date"].tolist() == ["", "03/04/2024"]
+
+
+def test_missing_cured_list_is_reported_to_the_sink(processor, sink, tmp_path, monkeypatch):
+    path = cured_list_file(tmp_path / "cured.xlsx", [{0: "BC1", 1: "AGENT1", 2: "2024-03-04", 3: 100}])
+    with open(path, "rb") as f:
+        data = f.read()
+
+    def missing(file_path):
+        raise FileNotFoundError(file_path)
+
+    monkeypatch.setattr(processor, "scan_cured_list", missing)
+    assert processor.process_cured_list(data, sheet_name="Sheet") is None
+    assert len(sink.messages("error")) == 1
+    assert sink.messages("error")[0].startswith("Error: The file '")
@@ -0,0 +1,257 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+import pytest
+from supabase import create_client
+
+import pandas as pd
+
+import processor.base as base
+from processor.base import SupabaseBatchClient, diff_records
+
+
+class StubPostgrest:
+    """
+    Tiny PostgREST stand-in: GET /rest/v1/<table> with in.(...) filters, order and
+    offset/limit paging over in-memory rows, and POST inserts/upserts. Values listed
+    in fail_values make any GET that filters on them answer 500.
+    """
+    def __init__(self, tables, max_rows=1000):
+        self.tables = tables
+        self.max_rows = max_rows
+        self.fail_values = set()
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                stub.requests.append((url.path, query, len(self.path)))
+                rows = stub.tables[url.path.rsplit('/', 1)[-1]]
+                for column, (condition,) in query.items():
+                    if condition.startswith('in.('):
+                        values = {unquote(value).strip('"') for value in condition[4:-1].split(',')}
+                        if values & stub.fail_values:
+                            self.send_response(500)
+                            self.send_header('Content-Length', '0')
+                            self.end_headers()
+                            return
+                        rows = [row for row in rows if str(row.get(column)) in values]
+                for column in reversed(query.get('order', [''])[0].split(',') if 'order' in query else []):
+                    name = column.split('.')[0]
+                    rows = sorted(rows, key=lambda row: row[name])
+                offset = int(query.get('offset', ['0'])[0])
+                limit = min(int(query.get('limit', [str(stub.max_rows)])[0]), stub.max_rows)
+                body = json.dumps(rows[offset:offset + limit]).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                # insert, or upsert (Prefer: resolution=merge-duplicates) on ?on_conflict=
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                records = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stub.requests.append((url.path, query, len(self.path)))
+                rows = stub.tables[url.path.rsplit('/', 1)[-1]]
+                conflict = query.get('on_conflict', [None])[0]
+                written = []
+                with stub.lock:
+                    for record in records if isinstance(records, list) else [records]:
+                        existing = next((row for row in rows if conflict and row.get(conflict) == record.get(conflict)), None)
+                        if existing is not None and 'merge-duplicates' in (self.headers.get('Prefer') or ''):
+                            existing.update(record)
+                            written.append(existing)
+                        else:
+                            row = {**record, 'id': record.get('id') or max([row['id'] for row in rows], default=0) + 1}
+                            rows.append(row)
+                            written.append(row)
+                body = json.dumps(written).encode()
+                self.send_response(201)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubPostgrest({
+        # 2,500 results for one chcode, all tied on chcode and status
+        'field_result': [{'id': i, 'chcode': 'CH1' if i < 2500 else f'CH{i}', 'status': 'VISITED'} for i in range(2600)],
+        'disposition': [{'id': i, 'disposition': f'D{i % 7}'} for i in range(2100)],
+    })
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def client(stub):
+    return SupabaseBatchClient(create_client(stub.url, 'x' * 40), backoff=0, max_batch=20)
+
+
+def test_split_batches_respects_url_length_and_batch_size():
+    client = SupabaseBatchClient(None, max_url_length=300, max_batch=50)
+    client.url_prefix_length = 40
+    values = [f'ACCOUNT-{i:06d}' for i in range(200)]
+    batches = client.split_batches('rob_bike_dataset', 'account_number', values, select='id, account_number')
+
+    assert [value for batch in batches for value in batch] == values
+    overhead = 40 + len('rob_bike_dataset') + len('id%2C%20account_number') + len('account_number') + 32
+    for batch in batches:
+        assert len(batch) <= 50
+        assert overhead + sum(len(f'%22{value}%22') + 3 for value in batch) <= 300
+
+    assert SupabaseBatchClient(None, max_batch=7).split_batches('t', 'c', range(20)) == \
+        [list(range(0, 7)), list(range(7, 14)), list(range(14, 20))]
+
+
+def test_batched_urls_stay_under_the_limit(stub):
+    client = SupabaseBatchClient(create_client(stub.url, 'x' * 40), max_url_length=500, max_batch=1000)
+    chcodes = [f'CH{i}' for i in range(2500, 2600)]
+    rows = client.fetch_in('field_result', 'chcode', chcodes)
+
+    assert sorted(row['id'] for row in rows) == list(range(2500, 2600))
+    assert len(stub.requests) > 1
+    # The stub sees the path only; the client budgets for the full URL
+    assert all(length + len(stub.url) <= 500 for _, _, length in stub.requests)
+
+
+def test_execute_retries_with_exponential_backoff(monkeypatch):
+    delays = []
+    monkeypatch.setattr(base.time, 'sleep', delays.append)
+    client = SupabaseBatchClient(None, max_retries=3, backoff=0.5)
+    attempts = []
+
+    class Query:
+        def execute(self):
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError('dropped')
+            return 'ok'
+
+    assert client.execute(Query) == 'ok'
+    assert delays == [0.5, 1.0]
+
+    attempts.clear()
+    delays.clear()
+
+    class Down:
+        def execute(self):
+            attempts.append(1)
+            raise ConnectionError('down')
+
+    with pytest.raises(ConnectionError):
+        client.execute(Down)
+    assert len(attempts) == 4
+    assert delays == [0.5, 1.0, 2.0]
+
+
+def test_execute_without_retry_runs_once(monkeypatch):
+    monkeypatch.setattr(base.time, 'sleep', lambda delay: pytest.fail('slept'))
+    client = SupabaseBatchClient(None)
+    calls = []
+
+    class Query:
+        def execute(self):
+            calls.append(1)
+            raise ConnectionError('response lost')
+
+    with pytest.raises(ConnectionError):
+        client.execute(Query, retry=False)
+    assert len(calls) == 1
+
+
+def test_fetch_in_follows_range_pages_in_a_stable_order(stub, client):
+    rows = client.fetch_in('field_result', 'chcode', ['CH1', 'CH2600', ''], page_size=1000,
+                           order=('chcode', 'status'))
+
+    assert sorted(row['id'] for row in rows) == list(range(2500))
+    pages = [query for _, query, _ in stub.requests]
+    assert [query['offset'][0] for query in pages] == ['0', '1000', '2000']
+    assert all(query['limit'] == ['1000'] for query in pages)
+    # A unique column closes the order so offset paging can't repeat or skip tied rows
+    assert all(query['order'][0].split(',')[-1].startswith('id') for query in pages)
+
+
+def test_fetch_table_pages_and_caches_until_invalidated(stub, client):
+    client.invalidate_table('disposition')
+    rows = client.fetch_table('disposition', select='id, disposition', order=('id',))
+    assert [row['id'] for row in rows] == list(range(2100))
+    assert [query['offset'][0] for _, query, _ in stub.requests] == ['0', '1000', '2000']
+
+    stub.requests.clear()
+    assert client.fetch_table('disposition', select='id, disposition', order=('id',)) == rows
+    assert stub.requests == []
+
+    client.invalidate_table('disposition')
+    client.fetch_table('disposition', select='id, disposition', order=('id',))
+    assert len(stub.requests) == 3
+    client.invalidate_table('disposition')
+
+
+def test_failed_batches_go_to_the_error_callback(stub, client):
+    stub.fail_values = {'CH2510'}
+    chcodes = [f'CH{i}' for i in range(2500, 2600)]
+    errors = []
+    progress = []
+    rows = client.fetch_in('field_result', 'chcode', chcodes,
+                           on_error=lambda batch, error: errors.append((batch, error)),
+                           on_progress=lambda done, total: progress.append((done, total)))
+
+    assert len(errors) == 1
+    failed_batch, error = errors[0]
+    assert 'CH2510' in failed_batch
+    assert sorted(row['chcode'] for row in rows) == sorted(set(chcodes) - set(failed_batch))
+    assert progress[-1] == (100, 100)
+
+    with pytest.raises(Exception):
+        client.fetch_in('field_result', 'chcode', chcodes)
+
+
+def upload_dataset(client, table, df, key='account_number'):
+    """The dataset upload flow in main.py: look up by key, diff, insert new rows, upsert changed rows on id."""
+    df = df.astype(object).where(pd.notnull(df), None)
+    df[key] = df[key].astype(str).str.strip()
+    existing_df = pd.DataFrame(client.fetch_in(table, key, df[key].unique().tolist()))
+    if not existing_df.empty:
+        existing_df[key] = existing_df[key].astype(str).str.strip()
+    df_insert, df_update, df_unchanged = diff_records(df, existing_df, key)
+    inserted = client.write_rows(table, df_insert.to_dict(orient='records'))
+    updated = client.write_rows(table, df_update.to_dict(orient='records'), upsert=True, on_conflict='id')
+    return inserted, updated, len(df_unchanged)
+
+
+def test_reuploading_a_dataset_does_not_duplicate_rows(stub, client):
+    # Upserts are keyed on id, which diff_records resolves from account_number, so
+    # account_number needs no unique constraint in the database
+    stub.tables['dataset'] = [{'id': 1, 'account_number': '100', 'chcode': 'CH-OLD'}]
+    upload = pd.DataFrame({'account_number': ['100', ' 101', '102'], 'chcode': ['CH-NEW', 'CH1', 'CH2']})
+
+    assert upload_dataset(client, 'dataset', upload) == (2, 1, 0)
+    assert upload_dataset(client, 'dataset', upload) == (0, 0, 3)
+
+    upload.loc[2, 'chcode'] = 'CH2-MOVED'
+    assert upload_dataset(client, 'dataset', upload) == (0, 1, 2)
+
+    rows = stub.tables['dataset']
+    assert sorted(row['account_number'] for row in rows) == ['100', '101', '102']
+    assert {row['account_number']: row['chcode'] for row in rows} == {'100': 'CH-NEW', '101': 'CH1', '102': 'CH2-MOVED'}
+    assert sorted(row['id'] for row in rows) == [1, 2, 3]
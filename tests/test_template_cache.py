@@ -0,0 +1,35 @@
+import os
+import shutil
+
+from processor.base import BaseProcessor
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "bdo_auto",
+                        "AGENCY DAILY REPORT TEMPLATE.xlsx")
+
+
+def test_each_output_gets_its_own_workbook(sink, tmp_path):
+    path = str(tmp_path / "template.xlsx")
+    shutil.copy(TEMPLATE, path)
+    processor = BaseProcessor(sink=sink)
+
+    first = processor.load_template(path)
+    second = processor.load_template(path)
+    assert first is not second
+    first.active["A1"] = "changed"
+    first.active.column_dimensions["ZZ"].width = 5
+    assert second.active["A1"].value != "changed"
+    assert processor.load_template(path).active["A1"].value == second.active["A1"].value
+
+
+def test_template_is_reread_when_the_file_changes(sink, tmp_path):
+    path = str(tmp_path / "template.xlsx")
+    shutil.copy(TEMPLATE, path)
+    processor = BaseProcessor(sink=sink)
+    assert processor.template_bytes(path) == processor.template_bytes(path)
+
+    workbook = processor.load_template(path)
+    workbook.active["A1"] = "new version"
+    workbook.save(path)
+    os.utime(path, ns=(os.stat(path).st_mtime_ns + 10**9,) * 2)
+
+    assert processor.load_template(path).active["A1"].value == "new version"
@@ -0,0 +1,213 @@
+import io
+import os
+import zipfile
+
+import openpyxl
+import pytest
+
+from processor.xlsx_patch import XlsxPatcher, CellMapTemplate, THIN_BORDER_XML
+
+TEMPLATES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+ROB_TEMPLATE = os.path.join(TEMPLATES, "rob_bike", "DAILY MONITORING PTP, DEPO & REPO REPORT TEMPLATE.xlsx")
+PRODUCTIVITY_TEMPLATE = os.path.join(TEMPLATES, "bdo_auto", "DAILY PRODUCTIVITY TEMPLATE.xlsx")
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def make_package(sheet_data, dimension="A1:B2", shared_strings=None, calc_chain=False):
+    """A minimal hand-written .xlsx (openpyxl never writes sharedStrings or calcChain)."""
+    overrides = [
+        ('/xl/workbook.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml'),
+        ('/xl/worksheets/sheet1.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'),
+        ('/xl/styles.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml'),
+    ]
+    rels = [
+        ('rId1', 'worksheet', 'worksheets/sheet1.xml'),
+        ('rId2', 'styles', 'styles.xml'),
+    ]
+    parts = {
+        'xl/worksheets/sheet1.xml': f'<worksheet xmlns="{MAIN_NS}"><dimension ref="{dimension}"/>'
+                                    f'<sheetData>{sheet_data}</sheetData></worksheet>',
+        'xl/styles.xml': f'<styleSheet xmlns="{MAIN_NS}"><fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+                         '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+                         '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+                         '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+                         '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+                         '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+                         '</styleSheet>',
+    }
+    if shared_strings is not None:
+        parts['xl/sharedStrings.xml'] = f'<sst xmlns="{MAIN_NS}">{shared_strings}</sst>'
+        overrides.append(('/xl/sharedStrings.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml'))
+        rels.append(('rId3', 'sharedStrings', 'sharedStrings.xml'))
+    if calc_chain:
+        parts['xl/calcChain.xml'] = f'<calcChain xmlns="{MAIN_NS}"><c r="B1" i="1"/></calcChain>'
+        overrides.append(('/xl/calcChain.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.calcChain+xml'))
+        rels.append(('rId4', 'calcChain', 'calcChain.xml'))
+
+    parts['[Content_Types].xml'] = (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        + ''.join(f'<Override PartName="{name}" ContentType="{content_type}"/>' for name, content_type in overrides)
+        + '</Types>')
+    parts['_rels/.rels'] = (
+        f'<Relationships xmlns="{PKG_REL_NS}"><Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/></Relationships>')
+    parts['xl/workbook.xml'] = (
+        f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheets><sheet name="Data" sheetId="1" r:id="rId1"/></sheets>'
+        '<calcPr calcId="191029"/></workbook>')
+    parts['xl/_rels/workbook.xml.rels'] = (
+        f'<Relationships xmlns="{PKG_REL_NS}">'
+        + ''.join(f'<Relationship Id="{rel_id}" Type="{REL_NS}/{rel_type}" Target="{target}"/>'
+                  for rel_id, rel_type, target in rels)
+        + '</Relationships>')
+
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w') as package:
+        for name, text in parts.items():
+            package.writestr(name, text)
+    return output.getvalue()
+
+
+def load(data):
+    return openpyxl.load_workbook(io.BytesIO(data))
+
+
+def style_key(cell):
+    return (cell.font.name, cell.font.sz, cell.font.b, cell.fill.fill_type, cell.fill.fgColor.rgb,
+            cell.border.left.style, cell.border.bottom.style, cell.alignment.horizontal, cell.number_format)
+
+
+def test_shared_strings_with_self_closing_entries():
+    data = make_package(
+        '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c></row>'
+        '<row r="2"><c r="A2" t="s"><v>2</v></c><c r="B2" t="s"><v>3</v></c></row>',
+        shared_strings='<si><t>a</t></si><si/><si><r><t>b</t></r><r><t xml:space="preserve"> c</t></r></si>'
+                       '<si><t>d&amp;e</t><rPh sb="0" eb="1"><t>x</t></rPh></si>')
+    patcher = XlsxPatcher(data)
+    assert patcher.shared_strings() == ['a', '', 'b c', 'd&e']
+
+    sheet = patcher.sheet()
+    assert sheet.row_values(1) == ['a', '']
+    assert sheet.column_values(1) == ['a', 'b c']
+    assert sheet.value(2, 2) == 'd&e'
+
+
+def test_inline_strings_round_trip_through_openpyxl():
+    data = make_package(
+        '<row r="1"><c r="A1" t="inlineStr"><is><r><t>rich</t></r><r><t xml:space="preserve"> text</t></r></is></c></row>')
+    patcher = XlsxPatcher(data)
+    sheet = patcher.sheet()
+    assert sheet.value(1, 1) == 'rich text'
+
+    sheet.set_values({'A2': '  padded <&> ', 'B2': 'line\nbreak', 'C2': 'bad\x01char', 'D2': 12, 'E2': 2.5,
+                      'F2': True, 'G2': '', 'H2': None})
+    ws = load(patcher.save())['Data']
+    assert ws['A1'].value == 'rich text'
+    assert [cell.value for cell in ws[2]][:8] == ['  padded <&> ', 'line\nbreak', 'badchar', 12, 2.5, True, None, None]
+
+
+def test_formula_overwrite_drops_calc_chain_and_forces_recalc():
+    data = make_package('<row r="1"><c r="A1"><v>1</v></c><c r="B1"><f>A1*2</f><v>2</v></c></row>', calc_chain=True)
+    patcher = XlsxPatcher(data)
+    patcher.sheet().set_value(1, 2, 5)
+    output = patcher.save()
+
+    package = zipfile.ZipFile(io.BytesIO(output))
+    assert 'xl/calcChain.xml' not in package.namelist()
+    assert 'calcChain' not in package.read('xl/_rels/workbook.xml.rels').decode()
+    assert 'calcChain' not in package.read('[Content_Types].xml').decode()
+    assert 'fullCalcOnLoad="1"' in package.read('xl/workbook.xml').decode()
+    assert load(output)['Data']['B1'].value == 5
+
+
+def test_formula_sheet_keeps_calc_chain_when_formulas_survive():
+    data = make_package('<row r="1"><c r="A1"><v>1</v></c><c r="B1"><f>A1*2</f><v>2</v></c></row>', calc_chain=True)
+    patcher = XlsxPatcher(data)
+    patcher.sheet().set_value(1, 1, 4)
+    package = zipfile.ZipFile(io.BytesIO(patcher.save()))
+
+    assert 'xl/calcChain.xml' in package.namelist()
+    assert 'fullCalcOnLoad="1"' in package.read('xl/workbook.xml').decode()
+    assert load(patcher.save())['Data']['B1'].value == '=A1*2'
+
+
+def test_dimension_grows_with_written_cells():
+    data = make_package('<row r="2"><c r="B2"><v>1</v></c></row>', dimension="B2")
+    patcher = XlsxPatcher(data)
+    sheet = patcher.sheet()
+    sheet.set_value(5, 4, 'x')
+    sheet.append_rows([[1, 2], [3, None]], start_col=2)
+    output = patcher.save()
+
+    sheet_xml = zipfile.ZipFile(io.BytesIO(output)).read('xl/worksheets/sheet1.xml').decode()
+    assert '<dimension ref="B2:D7"/>' in sheet_xml
+    ws = load(output)['Data']
+    assert ws.dimensions == 'B2:D7'
+    assert [[cell.value for cell in row] for row in ws.iter_rows(min_row=6, max_row=7, min_col=2, max_col=3)] == [[1, 2], [3, None]]
+
+
+def test_untouched_package_is_copied_byte_for_byte():
+    with open(ROB_TEMPLATE, 'rb') as f:
+        data = f.read()
+    output = XlsxPatcher(data).save()
+    original, copied = zipfile.ZipFile(io.BytesIO(data)), zipfile.ZipFile(io.BytesIO(output))
+    assert original.namelist() == copied.namelist()
+    for name in original.namelist():
+        assert original.read(name) == copied.read(name), name
+
+
+def test_rob_template_round_trip():
+    with open(ROB_TEMPLATE, 'rb') as f:
+        data = f.read()
+    before = load(data)
+
+    patcher = XlsxPatcher(data)
+    bordered = patcher.derive_style(0, border_id=patcher.add_border(THIN_BORDER_XML))
+    monitoring = patcher.sheet('MONITORING')
+    header = monitoring.row_values(1)
+    assert header == [cell.value for cell in before['MONITORING'][1]]
+
+    rows = [[f'name {i}', i, 1500.5, None] + [''] * (len(header) - 4) for i in range(3)]
+    assert monitoring.append_rows(rows, style=bordered) == (2, 4)
+    monitoring.set_column_widths({1: 30})
+    patcher.sheet('EOD').set_values({'C15': 'label', 'D15': 99})
+    after = load(patcher.save())
+
+    ws = after['MONITORING']
+    assert [[cell.value for cell in row][:4] for row in ws.iter_rows(min_row=2, max_row=4)] == \
+        [[f'name {i}', i, 1500.5, None] for i in range(3)]
+    assert all(cell.border.left.style == 'thin' for row in ws.iter_rows(min_row=2, max_row=4) for cell in row)
+    assert ws.column_dimensions['A'].width == 30
+    assert after['EOD']['C15'].value == 'label' and after['EOD']['D15'].value == 99
+
+    # Everything that was not written reads back as it was
+    for name in before.sheetnames:
+        for row in before[name].iter_rows():
+            for cell in row:
+                if (name, cell.coordinate) in {('EOD', 'C15'), ('EOD', 'D15')}:
+                    continue
+                patched = after[name][cell.coordinate]
+                assert patched.value == cell.value, (name, cell.coordinate)
+                assert style_key(patched) == style_key(cell), (name, cell.coordinate)
+
+
+def test_productivity_cell_map_round_trip():
+    with open(PRODUCTIVITY_TEMPLATE, 'rb') as f:
+        data = f.read()
+    before = load(data).active
+    template = CellMapTemplate(data, ('C2', 'G8'), number_formats={'G8': "0.00"}, autofit=True)
+    after = load(template.render({'C2': 'JUNE 1, 2024', 'G8': 12.345})).active
+
+    # C2 sits in a merged range, so the value lands in its top-left cell
+    date_cell = after.cell(*template.targets['C2'])
+    value_cell = after.cell(*template.targets['G8'])
+    assert date_cell.value == 'JUNE 1, 2024'
+    assert value_cell.value == pytest.approx(12.345)
+    assert value_cell.number_format == '0.00'
+    assert style_key(date_cell) == style_key(before.cell(*template.targets['C2']))
+    assert after.merged_cells.ranges == before.merged_cells.ranges